@@ -4,33 +4,41 @@ Main Streamlit application entry point with navigation and core functionality.
 """
 
 import asyncio
+import concurrent.futures
+import hashlib
 import io
-import json
-import logging
-from datetime import datetime, timedelta
+import threading
+from datetime import datetime
+from pathlib import Path
 from typing import List, Optional, Dict, Any
 from uuid import UUID
 
-import pandas as pd
+import jinja2
+import orjson
 import streamlit as st
+from loguru import logger
 from streamlit_option_menu import option_menu
-import plotly.express as px
-import plotly.graph_objects as go
 import streamlit.components.v1 as components  # at top after streamlit import
 
 from models import (
-    NoteCreate, SearchFilters, MediaUpload, NoteWithDetails,
-    TrackTypeEnum, SessionTypeEnum, CategoryEnum, MediaTypeEnum, UploadedMedia
+    NoteCreate, SearchFilters, MediaUpload, NoteWithDetails, FeedPage,
+    CategoryEnum, MediaTypeEnum, UploadedMedia,
+    SESSION_TYPE_BY_VALUE, CATEGORY_BY_VALUE
 )
 from supabase_client import get_supabase_client, initialize_client
 from storage_service import get_storage_service
 from utils import (
-    TimeUtils, CacheUtils, ValidationUtils, TextUtils, FormatUtils,
-    UIUtils, success_toast, error_toast, info_toast, warning_toast,
-    get_time_ago, format_size, truncate
+    CacheUtils, ValidationUtils, TextUtils, TimeUtils, FormatUtils,
+    success_toast, error_toast, info_toast,
+    format_size, truncate
 )
-import nest_asyncio
-nest_asyncio.apply()
+
+# Optional uvloop for the background event loop (not available on Windows)
+try:
+    import uvloop
+    UVLOOP_AVAILABLE = True
+except ImportError:
+    UVLOOP_AVAILABLE = False
 
 # Configure page
 st.set_page_config(
@@ -51,155 +59,193 @@ st.set_page_config(
 )
 
 # Custom CSS for racing theme
-st.markdown("""
-<style>
-    /* Racing theme colors */
-    :root {
-        --primary-color: #1E3A8A;
-        --secondary-color: #3B82F6;
-        --accent-color: #EF4444;
-        --success-color: #10B981;
-        --warning-color: #F59E0B;
-        --dark-bg: #1F2937;
-        --light-bg: #F9FAFB;
-    }
-    
-    /* Custom card styling */
-    .note-card {
-        background: white;
-        border-radius: 12px;
-        padding: 20px;
-        margin: 16px 0;
-        box-shadow: 0 2px 8px rgba(0, 0, 0, 0.1);
-        border-left: 4px solid var(--primary-color);
-        transition: all 0.3s ease;
-    }
-    
-    .note-card:hover {
-        box-shadow: 0 4px 16px rgba(0, 0, 0, 0.15);
-        transform: translateY(-2px);
-    }
-    
-    /* Tag styling */
-    .tag {
-        background: var(--secondary-color);
-        color: white;
-        padding: 4px 12px;
-        border-radius: 20px;
-        font-size: 0.8em;
-        margin: 2px 4px;
-        display: inline-block;
-    }
-    
-    /* Media preview styling */
-    .media-preview {
-        border-radius: 8px;
-        overflow: hidden;
-        margin: 10px 0;
-    }
-    
-    /* Progress bar styling */
-    .upload-progress {
-        background: var(--light-bg);
-        border-radius: 8px;
-        padding: 10px;
-        margin: 10px 0;
-    }
-    
-    /* Navigation styling */
-    .nav-link {
-        color: var(--primary-color);
-        text-decoration: none;
-        padding: 8px 16px;
-        border-radius: 8px;
-        transition: all 0.3s ease;
-    }
-    
-    .nav-link:hover {
-        background: var(--light-bg);
-        color: var(--secondary-color);
-    }
-    
-    /* Responsive design */
-    @media (max-width: 768px) {
-        .note-card {
-            padding: 15px;
-            margin: 12px 0;
-        }
-    }
-    
-    /* Hide Streamlit footer */
-    footer {
-        visibility: hidden;
-    }
-    
-    /* Custom button styling */
-    .stButton > button {
-        background: var(--primary-color);
-        color: white;
-        border: none;
-        border-radius: 8px;
-        padding: 8px 16px;
-        transition: all 0.3s ease;
-    }
-    
-    .stButton > button:hover {
-        background: var(--secondary-color);
-        transform: translateY(-1px);
-    }
-</style>
-""", unsafe_allow_html=True)
+@st.cache_resource(show_spinner=False)
+def _theme_css() -> str:
+    """Read the racing theme stylesheet once per process."""
+    return (Path(__file__).parent / "assets" / "theme.css").read_text(encoding="utf-8")
+
+st.html(f"<style>{_theme_css()}</style>")
+
+# Maximum number of media files processed at once
+MAX_CONCURRENT_UPLOADS = 5
+
+# Note bodies longer than this are collapsed in the feed
+FEED_PREVIEW_CHARS = 800
+
+# Sidebar navigation, built once rather than on every rerun
+_MENU_OPTIONS = ["Home Feed", "Create Note", "Media Search", "Settings"]
+_MENU_ICONS = ["house", "plus-circle", "camera", "gear"]
+_MENU_STYLES = {
+    "container": {"padding": "0!important", "background-color": "transparent"},
+    "icon": {"color": "#1E3A8A", "font-size": "18px"},
+    "nav-link": {"font-size": "16px", "text-align": "left", "margin": "0px"},
+    "nav-link-selected": {"background-color": "#3B82F6", "color": "white"},
+}
+
+def _set_filters(filters: SearchFilters) -> None:
+    """Store the feed filters along with a stable digest used as their cache key."""
+    st.session_state.filters = filters
+    st.session_state.filters_key = hashlib.blake2b(
+        filters.model_dump_json().encode(), digest_size=16
+    ).hexdigest()
 
 # Initialize session state
-if 'initialized' not in st.session_state:
-    st.session_state.initialized = False
+if 'current_page' not in st.session_state:
     st.session_state.current_page = "Home Feed"
-    st.session_state.filters = SearchFilters()
+    _set_filters(SearchFilters())
+    st.session_state.page_cursors = []
     st.session_state.upload_progress = {}
 
+# Shared event loop
+@st.cache_resource(show_spinner=False)
+def _get_loop() -> asyncio.AbstractEventLoop:
+    """Start a persistent event loop on a background thread."""
+    loop = uvloop.new_event_loop() if UVLOOP_AVAILABLE else asyncio.new_event_loop()
+    # Blocking Supabase calls run here via asyncio.to_thread; stay under the HTTP pool size.
+    loop.set_default_executor(
+        concurrent.futures.ThreadPoolExecutor(max_workers=16, thread_name_prefix="racing-notes-io")
+    )
+    threading.Thread(target=loop.run_forever, name="racing-notes-loop", daemon=True).start()
+    return loop
+
+def arun(coro, timeout: float = 60):
+    """Run a coroutine on the shared event loop and wait for its result; cancel it on timeout."""
+    future = asyncio.run_coroutine_threadsafe(coro, _get_loop())
+    try:
+        return future.result(timeout=timeout)
+    except concurrent.futures.TimeoutError:
+        # Don't leave an abandoned query holding pooled connections
+        future.cancel()
+        raise
+
 # Initialize clients
-@st.cache_resource
+@st.cache_resource(show_spinner="Initializing Racing Notes...")
 def init_clients():
-    """Initialize database and storage clients."""
-    try:
-        asyncio.run(initialize_client())
-        return True
-    except Exception as e:
-        st.error(f"Failed to initialize clients: {e}")
-        return False
+    """Initialize database and storage clients once per process; failures are retried next run."""
+    arun(initialize_client())
+    get_storage_service()
+    return True
+
+async def _fetch_reference_data(client):
+    """Fetch tracks, series and tags in one RPC."""
+    tracks, series, _, tags = await client.get_reference_data()
+    return tracks, series, tags
+
+@st.cache_data(ttl=1800, show_spinner=False)
+def _cached_reference_data():
+    """Fetch tracks, series and tags once and share them across sessions."""
+    return arun(_fetch_reference_data(get_supabase_client()))
+
+@st.cache_data(ttl=1800, show_spinner=False)
+def _reference_lookups():
+    """Map display labels for tracks, series and tags to their IDs."""
+    tracks, series, tags = _cached_reference_data()
+    return (
+        {f"{t.name} ({t.type})": t.id for t in tracks},
+        {s.name: s.id for s in series},
+        {t.label: t.id for t in tags},
+    )
 
 def load_cached_data():
     """Load frequently used data with caching."""
     try:
-        client = get_supabase_client()
-        
-        # Cache tracks
-        cache_key = "tracks_list"
-        tracks = CacheUtils.get_cached_data(cache_key)
-        if tracks is None:
-            tracks = asyncio.run(client.get_tracks())
-            CacheUtils.cache_data(cache_key, tracks, ttl=3600)
-        
-        # Cache series
-        cache_key = "series_list"
-        series = CacheUtils.get_cached_data(cache_key)
-        if series is None:
-            series = asyncio.run(client.get_series())
-            CacheUtils.cache_data(cache_key, series, ttl=3600)
-        
-        # Cache tags
-        cache_key = "tags_list"
-        tags = CacheUtils.get_cached_data(cache_key)
-        if tags is None:
-            tags = asyncio.run(client.get_tags())
-            CacheUtils.cache_data(cache_key, tags, ttl=1800)
-        
-        return tracks, series, tags
+        return _cached_reference_data()
     except Exception as e:
         st.error(f"Failed to load cached data: {e}")
         return [], [], []
 
-def create_note_card(note: NoteWithDetails) -> None:
+@st.cache_data(ttl=30, show_spinner=False)
+def _cached_stats() -> Dict[str, Any]:
+    """Fetch dashboard statistics, shared across reruns for a short TTL."""
+    return arun(get_supabase_client().get_stats())
+
+@st.cache_data(ttl=60, show_spinner=False, max_entries=64)
+def _cached_feed_page(filters_json: str) -> bytes:
+    """Fetch one feed page as JSON, shared across sessions asking for the same filters."""
+    filters = SearchFilters.model_validate_json(filters_json)
+    return arun(get_supabase_client().get_feed_page(filters)).model_dump_json().encode()
+
+async def _resolve_tags(client, names: List[str]):
+    """Get or create all tags concurrently."""
+    return await asyncio.gather(*(client.get_or_create_tag(name) for name in names))
+
+async def _process_upload(storage_service, semaphore: asyncio.Semaphore, file):
+    """Compress and upload one file, bounded by the shared semaphore."""
+    async with semaphore:
+        media_upload = MediaUpload(
+            filename=file.name,
+            content_type=file.type,
+            size_bytes=file.size,
+            data=file
+        )
+        return await storage_service.process_and_upload_media(media_upload)
+
+async def _submit_note(
+    client,
+    note_data: NoteCreate,
+    session_kwargs: Optional[Dict[str, Any]],
+    tag_names: List[str],
+    files: List[Any],
+    upload_futures: List[concurrent.futures.Future],
+):
+    """Create a note with its session, tags and media, returning it with any failed uploads."""
+    session, tags_resolved, upload_results = await asyncio.gather(
+        client.create_session(**session_kwargs) if session_kwargs else asyncio.sleep(0),
+        _resolve_tags(client, tag_names),
+        asyncio.gather(*(asyncio.wrap_future(future) for future in upload_futures), return_exceptions=True),
+    )
+    if session:
+        note_data.session_id = session.id
+    note_data.tag_ids = [tag.id for tag in tags_resolved]
+    
+    failed_uploads = []
+    for file, result in zip(files, upload_results):
+        if isinstance(result, Exception):
+            failed_uploads.append((file.name, result))
+            continue
+        public_url, size_mb, new_filename = result
+        note_data.media_files.append(UploadedMedia(
+            file_url=public_url,
+            type=MediaTypeEnum.IMAGE if file.type.startswith('image/') else MediaTypeEnum.VIDEO,
+            size_mb=size_mb,
+            filename=new_filename
+        ))
+    
+    note = await client.create_note(note_data)
+    if note_data.media_files:
+        await client.create_media_bulk(note.id, note_data.media_files)
+    # One coalesced view refresh covers the note and its media; wait so the feed shows them
+    await client.wait_for_refresh()
+    return note, failed_uploads
+
+# Note card markup, compiled once at import
+_NOTE_CARD_TEMPLATE = jinja2.Environment(
+    loader=jinja2.FileSystemLoader(Path(__file__).parent / "templates"),
+    autoescape=True,
+).get_template("note_card.html")
+
+@st.cache_data(max_entries=500, show_spinner=False)
+def _render_note_html(note_id: str, updated_at: str, payload: Dict[str, Any]) -> str:
+    """Build the note card HTML, cached per note version and display payload."""
+    return _NOTE_CARD_TEMPLATE.render(**payload)
+
+def _feed_displays(page: FeedPage) -> List[Dict[str, Any]]:
+    """Precompute the card fields that do not depend on widget state, straight from the page columns."""
+    times_ago = TimeUtils.humanize_datetimes(page.created_at)
+    return [
+        {
+            "driver_name": page.driver_names[i],
+            "time_ago": times_ago[i],
+            "track_name": page.track_names[i],
+            "series_name": page.series_names[i],
+            "session_type": page.session_types[i].value if page.session_types[i] else None,
+            "category": (page.categories[i] or CategoryEnum.GENERAL).value,
+            "tag_labels": page.tag_labels(i),
+        }
+        for i in range(len(page))
+    ]
+
+def create_note_card(note: NoteWithDetails, display: Dict[str, Any]) -> None:
     """Create a note card component."""
     try:
         with st.container():
@@ -207,40 +253,19 @@ def create_note_card(note: NoteWithDetails) -> None:
             col1, col2 = st.columns([3, 1])
             
             with col1:
-                components.html(f"""
-                <div style=\"background:#2D3748; border-radius:12px; padding:20px; margin:16px 0;\">
-                    <div style=\"display: flex; align-items: center; margin-bottom: 10px;\">
-                        <div style=\"width: 40px; height: 40px; background: #3B82F6; \
-                                    border-radius: 50%; display: flex; align-items: center; \
-                                    justify-content: center; margin-right: 12px;\">
-                            <span style=\"color: white; font-weight: bold;\">🏁</span>
-                        </div>
-                        <div>
-                            <div style=\"font-weight: 600; color: #E2E8F0;\">
-                                {note.driver_name or "General Note"}
-                            </div>
-                            <div style=\"font-size: 0.9em; color: #CCCCCC;\">
-                                {get_time_ago(note.created_at)}
-                            </div>
-                        </div>
-                    </div>
-                    
-                    <div style=\"margin-bottom: 15px; line-height: 1.5; color:#F1F1F1;\">
-                        {note.body}
-                    </div>
-                    
-                    <div style=\"display: flex; flex-wrap: wrap; gap: 8px; margin-bottom: 10px;\">
-                        {f'<span style=\"background: #3B82F6; color: white; padding: 4px 12px; border-radius: 20px; font-size: 0.8em; margin: 2px 4px; display: inline-block;\">📍 {note.track_name}</span>' if note.track_name else ''}
-                        {f'<span style=\"background: #10B981; color: white; padding: 4px 12px; border-radius: 20px; font-size: 0.8em; margin: 2px 4px; display: inline-block;\">🏆 {note.series_name}</span>' if note.series_name else ''}
-                        {f'<span style=\"background: #F59E0B; color: white; padding: 4px 12px; border-radius: 20px; font-size: 0.8em; margin: 2px 4px; display: inline-block;\">�� {note.session_type.value}</span>' if note.session_type else ''}
-                        {f'<span style=\"background: #8B5CF6; color: white; padding: 4px 12px; border-radius: 20px; font-size: 0.8em; margin: 2px 4px; display: inline-block;\">📂 {note.category.value}</span>'}
-                    </div>
-                    
-                    <div style=\"display: flex; gap: 8px;\">
-                        {''.join([f'<span style=\"background: #6B7280; color: white; padding: 4px 12px; border-radius: 20px; font-size: 0.8em; margin: 2px 4px; display: inline-block;\">#{tag.label}</span>' for tag in (note.tags or [])])}
-                    </div>
-                </div>
-                """, height=320)
+                card = st.container()
+                is_long = len(note.body) > FEED_PREVIEW_CHARS
+                show_full = is_long and st.checkbox("Show full", key=f"exp_{note.id}")
+                payload = {
+                    **display,
+                    "body": note.body if show_full or not is_long else truncate(note.body, FEED_PREVIEW_CHARS),
+                }
+                with card:
+                    components.html(
+                        _render_note_html(str(note.id), note.updated_at.isoformat(), payload),
+                        height=320,
+                        scrolling=show_full
+                    )
             
             with col2:
                 # Action buttons
@@ -277,10 +302,12 @@ def create_note_form():
     """Create note creation form."""
     try:
         st.subheader("✍️ Create New Note")
+        client = get_supabase_client()
         
         with st.form("note_form", clear_on_submit=True):
             # Load cached data
             tracks, series, tags = load_cached_data()
+            track_key_to_id, series_name_to_id, _ = _reference_lookups()
             
             # Note body
             note_body = st.text_area(
@@ -304,19 +331,20 @@ def create_note_form():
                 # Category
                 category = st.selectbox(
                     "Category",
-                    [cat.value for cat in CategoryEnum],
+                    list(CATEGORY_BY_VALUE),
                     index=0
                 )
             
             with col2:
                 # Driver selection (filtered by series)
                 driver_options = ["None"]
+                driver_name_to_id = {}
                 if selected_series != "None":
                     try:
-                        series_id = next(s.id for s in series if s.name == selected_series)
-                        client = get_supabase_client()
-                        drivers = asyncio.run(client.get_drivers(series_id))
-                        driver_options.extend([driver.name for driver in drivers])
+                        series_id = series_name_to_id[selected_series]
+                        drivers = arun(client.get_drivers(series_id))
+                        driver_name_to_id = {driver.name: driver.id for driver in drivers}
+                        driver_options.extend(driver_name_to_id)
                     except Exception:
                         pass
                 
@@ -325,7 +353,7 @@ def create_note_form():
                 # Session type
                 session_type = st.selectbox(
                     "Session Type",
-                    ["None"] + [session.value for session in SessionTypeEnum]
+                    ["None", *SESSION_TYPE_BY_VALUE]
                 )
                 
                 # Shared toggle
@@ -365,115 +393,74 @@ def create_note_form():
                     note_data = NoteCreate(
                         body=note_body,
                         shared=shared,
-                        category=CategoryEnum(category)
+                        category=CATEGORY_BY_VALUE[category]
                     )
                     
-                    # Set optional fields
-                    if selected_track != "None":
-                        track_id = next(t.id for t in tracks if f"{t.name} ({t.type})" == selected_track)
-                        
-                        # Create session if session type is selected
-                        if session_type != "None":
-                            client = get_supabase_client()
-                            series_id = next(s.id for s in series if s.name == selected_series) if selected_series != "None" else None
-                            
-                            if series_id:
-                                session = asyncio.run(client.create_session(
-                                    date=datetime.now(),
-                                    session_type=SessionTypeEnum(session_type),
-                                    track_id=track_id,
-                                    series_id=series_id
-                                ))
-                                note_data.session_id = session.id
+                    # Collect the related records to create alongside the note
+                    session_kwargs = None
+                    if selected_track != "None" and session_type != "None":
+                        series_id = series_name_to_id.get(selected_series)
+                        if series_id:
+                            session_kwargs = {
+                                "date": datetime.now(),
+                                "session_type": SESSION_TYPE_BY_VALUE[session_type],
+                                "track_id": track_key_to_id[selected_track],
+                                "series_id": series_id,
+                            }
                     
                     if selected_driver != "None":
-                        driver_id = next(d.id for d in drivers if d.name == selected_driver)
-                        note_data.driver_id = driver_id
+                        note_data.driver_id = driver_name_to_id[selected_driver]
                     
-                    # Process tags
-                    if tag_input.strip():
-                        client = get_supabase_client()
-                        tag_names = [tag.strip() for tag in tag_input.split(',')]
-                        tag_ids = []
-                        
-                        for tag_name in tag_names:
-                            if tag_name:
-                                tag = asyncio.run(client.get_or_create_tag(tag_name))
-                                tag_ids.append(tag.id)
-                        
-                        note_data.tag_ids = tag_ids
+                    tag_names = [tag.strip() for tag in tag_input.split(',') if tag.strip()]
                     
-                    # Process media files
+                    # Validate media files
+                    valid_files = []
                     if uploaded_files:
-                        storage_service = get_storage_service()
-                        media_uploads = []
-                        
                         total_size = sum(file.size for file in uploaded_files)
                         if total_size > 100 * 1024 * 1024:  # 100MB
                             error_toast("Total file size exceeds 100MB limit")
                             return
                         
-                        progress_bar = st.progress(0)
-                        status_text = st.empty()
-                        
-                        for i, file in enumerate(uploaded_files):
-                            progress = (i + 1) / len(uploaded_files)
-                            progress_bar.progress(progress)
-                            status_text.text(f"Processing {file.name}...")
-                            
-                            # Validate file
+                        for file in uploaded_files:
                             is_valid, message = ValidationUtils.validate_media_type(file.name)
                             if not is_valid:
                                 error_toast(f"Invalid file {file.name}: {message}")
                                 continue
-                            
-                            # Create media upload
-                            media_upload = MediaUpload(
-                                filename=file.name,
-                                content_type=file.type,
-                                size_bytes=file.size,
-                                data=file.read()
-                            )
-                            
-                            try:
-                                # Process and upload
-                                public_url, size_mb, new_filename = asyncio.run(
-                                    storage_service.process_and_upload_media(media_upload)
-                                )
-                                
-                                media_uploads.append(UploadedMedia(
-                                    file_url=public_url,
-                                    type=MediaTypeEnum.IMAGE if file.type.startswith('image/') else MediaTypeEnum.VIDEO,
-                                    size_mb=size_mb,
-                                    filename=new_filename
-                                ))
-                                
-                            except Exception as e:
-                                error_toast(f"Failed to process {file.name}: {e}")
-                        
+                            valid_files.append(file)
+                    
+                    # Start the uploads, then submit the note once they finish
+                    storage_service = get_storage_service()
+                    semaphore = asyncio.Semaphore(MAX_CONCURRENT_UPLOADS)
+                    upload_futures = [
+                        asyncio.run_coroutine_threadsafe(
+                            _process_upload(storage_service, semaphore, file), _get_loop()
+                        )
+                        for file in valid_files
+                    ]
+                    submit_future = asyncio.run_coroutine_threadsafe(
+                        _submit_note(client, note_data, session_kwargs, tag_names, valid_files, upload_futures),
+                        _get_loop()
+                    )
+                    
+                    if upload_futures:
+                        progress_bar = st.progress(0)
+                        status_text = st.empty()
+                        status_text.text(f"Processing {len(upload_futures)} files...")
+                        for i, _ in enumerate(concurrent.futures.as_completed(upload_futures)):
+                            progress_bar.progress((i + 1) / len(upload_futures))
                         progress_bar.empty()
                         status_text.empty()
-                        
-                        note_data.media_files = media_uploads
-                    
-                    # Create note
-                    client = get_supabase_client()
-                    note = asyncio.run(client.create_note(note_data))
                     
-                    # Create media records
-                    for media_info in note_data.media_files:
-                        asyncio.run(client.create_media(
-                            note_id=note.id,
-                            file_url=media_info.file_url,
-                            media_type=media_info.type,
-                            size_mb=media_info.size_mb,
-                            filename=media_info.filename
-                        ))
+                    note, failed_uploads = submit_future.result()
+                    for filename, error in failed_uploads:
+                        error_toast(f"Failed to process {filename}: {error}")
                     
                     success_toast("Note created successfully!")
                     
                     # Clear cache
                     CacheUtils.clear_cache("notes_feed")
+                    _cached_feed_page.clear()
+                    _cached_stats.clear()
                     
                     # Rerun to show updated feed
                     st.rerun()
@@ -484,6 +471,90 @@ def create_note_form():
     except Exception as e:
         st.error(f"Error creating note form: {e}")
 
+def _next_page(last_created_at: datetime, last_id: UUID) -> None:
+    """Advance the feed past the last note shown, remembering the current cursor."""
+    filters = st.session_state.filters
+    st.session_state.page_cursors.append((filters.cursor_created_at, filters.cursor_id))
+    _set_filters(filters.model_copy(update={
+        "cursor_created_at": last_created_at,
+        "cursor_id": last_id,
+        "offset": filters.offset + filters.limit,
+    }))
+
+def _previous_page() -> None:
+    """Return the feed to the cursor of the previous page."""
+    filters = st.session_state.filters
+    cursor_created_at, cursor_id = st.session_state.page_cursors.pop() if st.session_state.page_cursors else (None, None)
+    _set_filters(filters.model_copy(update={
+        "cursor_created_at": cursor_created_at,
+        "cursor_id": cursor_id,
+        "offset": max(0, filters.offset - filters.limit),
+    }))
+
+@st.cache_resource(show_spinner=False)
+def _get_prefetch_executor() -> concurrent.futures.ThreadPoolExecutor:
+    """Threads that warm the shared feed cache, kept apart from the event loop's executor."""
+    return concurrent.futures.ThreadPoolExecutor(max_workers=4, thread_name_prefix="racing-notes-prefetch")
+
+def _prefetch_feed() -> None:
+    """Start loading the current feed page so it overlaps with the sidebar stats."""
+    cache_key = CacheUtils.get_cache_key("notes_feed", st.session_state.filters_key)
+    if CacheUtils.get_cached_data(cache_key) is None:
+        # Go through _cached_feed_page so a page another session already fetched is reused.
+        # Its own pool blocks in arun(), so the loop's executor stays free for the query.
+        st.session_state.feed_prefetch = (cache_key, _get_prefetch_executor().submit(
+            _cached_feed_page, st.session_state.filters.model_dump_json()
+        ))
+
+@st.fragment
+def _render_feed():
+    """Render the notes list and pagination; reruns independently of the filters."""
+    try:
+        # Check cache first
+        cache_key = CacheUtils.get_cache_key("notes_feed", st.session_state.filters_key)
+        cached_notes = CacheUtils.get_cached_data(cache_key)
+        
+        if cached_notes is None:
+            prefetch = st.session_state.pop("feed_prefetch", None)
+            if prefetch and prefetch[0] == cache_key:
+                page_json = prefetch[1].result(timeout=60)
+            else:
+                page_json = _cached_feed_page(st.session_state.filters.model_dump_json())
+            page = FeedPage.model_validate_json(page_json)
+            displays = _feed_displays(page)
+            CacheUtils.cache_data(cache_key, (page, displays), ttl=300)  # 5 minutes
+        else:
+            page, displays = cached_notes
+        
+        # Display notes
+        if len(page):
+            st.write(f"📊 Showing {len(page)} of {page.total} notes")
+            
+            for i, display in enumerate(displays):
+                create_note_card(page.row(i), display)
+            
+            # Pagination
+            if page.has_next or page.has_previous:
+                col1, col2, col3 = st.columns([1, 2, 1])
+                
+                with col1:
+                    if page.has_previous:
+                        st.button("← Previous", on_click=_previous_page)
+                
+                with col2:
+                    current_page = (st.session_state.filters.offset // st.session_state.filters.limit) + 1
+                    total_pages = (page.total + st.session_state.filters.limit - 1) // st.session_state.filters.limit
+                    st.write(f"Page {current_page} of {total_pages}")
+                
+                with col3:
+                    if page.has_next:
+                        st.button("Next →", on_click=_next_page, args=(page.created_at[-1], page.ids[-1]))
+        else:
+            st.info("🏁 No notes found. Create your first note to get started!")
+            
+    except Exception as e:
+        st.error(f"Failed to load notes: {e}")
+
 def show_notes_feed():
     """Display the main notes feed."""
     try:
@@ -498,6 +569,7 @@ def show_notes_feed():
             
             # Load cached data
             tracks, series, tags = load_cached_data()
+            track_key_to_id, series_name_to_id, tag_label_to_id = _reference_lookups()
             
             # Filter options
             with st.expander("📍 Track & Series"):
@@ -516,7 +588,7 @@ def show_notes_feed():
             with st.expander("🏷️ Categories & Tags"):
                 selected_categories = st.multiselect(
                     "Categories",
-                    options=[cat.value for cat in CategoryEnum],
+                    options=list(CATEGORY_BY_VALUE),
                     default=[]
                 )
                 
@@ -535,76 +607,82 @@ def show_notes_feed():
                 # Build filters
                 filters = SearchFilters(
                     text_query=search_query if search_query else None,
-                    categories=[CategoryEnum(cat) for cat in selected_categories],
+                    categories=[CATEGORY_BY_VALUE[cat] for cat in selected_categories],
                     date_from=datetime.combine(date_from, datetime.min.time()) if date_from else None,
                     date_to=datetime.combine(date_to, datetime.max.time()) if date_to else None
                 )
                 
                 # Convert selections to IDs
                 if selected_tracks:
-                    track_ids = [next(t.id for t in tracks if f"{t.name} ({t.type})" == track) for track in selected_tracks]
+                    track_ids = [track_key_to_id[track] for track in selected_tracks]
                     filters.track_ids = track_ids
                 
                 if selected_series:
-                    series_ids = [next(s.id for s in series if s.name == ser) for ser in selected_series]
+                    series_ids = [series_name_to_id[ser] for ser in selected_series]
                     filters.series_ids = series_ids
                 
                 if selected_tags:
-                    tag_ids = [next(t.id for t in tags if t.label == tag) for tag in selected_tags]
+                    tag_ids = [tag_label_to_id[tag] for tag in selected_tags]
                     filters.tag_ids = tag_ids
                 
-                st.session_state.filters = filters
+                _set_filters(filters)
+                st.session_state.page_cursors = []
                 CacheUtils.clear_cache("notes_feed")
         
-        # Load notes
-        try:
-            client = get_supabase_client()
-            
-            # Check cache first
-            cache_key = CacheUtils.get_cache_key("notes_feed", str(st.session_state.filters.dict()))
-            cached_notes = CacheUtils.get_cached_data(cache_key)
+        _render_feed()
+    
+    except Exception as e:
+        st.error(f"Error displaying notes feed: {e}")
+
+@st.fragment
+def _render_media_results(search_query: str):
+    """Render the media search grid; reruns independently of the search box."""
+    try:
+        client = get_supabase_client()
+        filters = SearchFilters(text_query=search_query) if search_query else None
+        
+        media_results = arun(client.search_media(filters))
+        
+        if media_results:
+            st.write(f"Found {len(media_results)} media files")
             
-            if cached_notes is None:
-                notes_response = asyncio.run(client.get_notes_feed(st.session_state.filters))
-                CacheUtils.cache_data(cache_key, notes_response, ttl=300)  # 5 minutes
-            else:
-                notes_response = cached_notes
+            # Format the per-file columns in one pass each
+            sizes = FormatUtils.format_file_sizes(
+                [int(media.get('size_mb', 0) * 1024 * 1024) for media in media_results]
+            )
+            dates = TimeUtils.humanize_datetimes(
+                [datetime.fromisoformat(media.get('created_at', '')) for media in media_results]
+            )
             
-            # Display notes
-            if notes_response.items:
-                st.write(f"📊 Showing {len(notes_response.items)} of {notes_response.total} notes")
-                
-                for note in notes_response.items:
-                    create_note_card(note)
-                
-                # Pagination
-                if notes_response.has_next or notes_response.has_previous:
-                    col1, col2, col3 = st.columns([1, 2, 1])
+            # Grid layout
+            cols = st.columns(3)
+            for i, media in enumerate(media_results):
+                with cols[i % 3]:
+                    st.subheader(media.get("filename", "Unknown"))
                     
-                    with col1:
-                        if notes_response.has_previous and st.button("← Previous"):
-                            st.session_state.filters.offset = max(0, st.session_state.filters.offset - st.session_state.filters.limit)
-                            CacheUtils.clear_cache("notes_feed")
-                            st.rerun()
+                    if media.get("type") == "image":
+                        st.image(media.get("file_url"), use_column_width=True)
+                    elif media.get("type") == "video":
+                        st.video(media.get("file_url"))
                     
-                    with col2:
-                        current_page = (st.session_state.filters.offset // st.session_state.filters.limit) + 1
-                        total_pages = (notes_response.total + st.session_state.filters.limit - 1) // st.session_state.filters.limit
-                        st.write(f"Page {current_page} of {total_pages}")
+                    st.write(f"**Size:** {sizes[i]}")
+                    st.write(f"**Date:** {dates[i]}")
                     
-                    with col3:
-                        if notes_response.has_next and st.button("Next →"):
-                            st.session_state.filters.offset += st.session_state.filters.limit
-                            CacheUtils.clear_cache("notes_feed")
-                            st.rerun()
-            else:
-                st.info("🏁 No notes found. Create your first note to get started!")
-                
-        except Exception as e:
-            st.error(f"Failed to load notes: {e}")
-    
+                    if media.get("note_body"):
+                        st.write(f"**Note:** {truncate(media.get('note_body'), 100)}")
+                    
+                    if st.button("Download", key=f"download_{media.get('id')}"):
+                        st.download_button(
+                            label="Download File",
+                            data=media.get("file_url"),
+                            file_name=media.get("filename"),
+                            key=f"dl_{media.get('id')}"
+                        )
+        else:
+            st.info("No media found for the search criteria")
+            
     except Exception as e:
-        st.error(f"Error displaying notes feed: {e}")
+        st.error(f"Media search failed: {e}")
 
 def show_media_search():
     """Display media search interface."""
@@ -615,52 +693,47 @@ def show_media_search():
         search_query = st.text_input("Search media...", placeholder="Search by filename or note content...")
         
         if st.button("Search") or search_query:
-            try:
-                client = get_supabase_client()
-                filters = SearchFilters(text_query=search_query) if search_query else None
-                
-                media_results = asyncio.run(client.search_media(filters))
-                
-                if media_results:
-                    st.write(f"Found {len(media_results)} media files")
-                    
-                    # Grid layout
-                    cols = st.columns(3)
-                    for i, media in enumerate(media_results):
-                        with cols[i % 3]:
-                            st.subheader(media.get("filename", "Unknown"))
-                            
-                            if media.get("type") == "image":
-                                st.image(media.get("file_url"), use_column_width=True)
-                            elif media.get("type") == "video":
-                                st.video(media.get("file_url"))
-                            
-                            st.write(f"**Size:** {format_size(int(media.get('size_mb', 0) * 1024 * 1024))}")
-                            st.write(f"**Date:** {get_time_ago(datetime.fromisoformat(media.get('created_at', '')))}")
-                            
-                            if media.get("note_body"):
-                                st.write(f"**Note:** {truncate(media.get('note_body'), 100)}")
-                            
-                            if st.button("Download", key=f"download_{media.get('id')}"):
-                                st.download_button(
-                                    label="Download File",
-                                    data=media.get("file_url"),
-                                    file_name=media.get("filename"),
-                                    key=f"dl_{media.get('id')}"
-                                )
-                else:
-                    st.info("No media found for the search criteria")
-                    
-            except Exception as e:
-                st.error(f"Media search failed: {e}")
+            _render_media_results(search_query)
     
     except Exception as e:
         st.error(f"Error in media search: {e}")
 
+EXPORT_MAX_NOTES = 1000
+
+async def _fetch_export_notes(client):
+    """Page through the feed to collect notes for export."""
+    filters = SearchFilters(limit=100)
+    notes = []
+    while len(notes) < EXPORT_MAX_NOTES:
+        response = await client.get_notes_feed(filters)
+        notes.extend(response.items)
+        if not response.has_next:
+            break
+        filters.cursor_created_at, filters.cursor_id = response.items[-1].created_at, response.items[-1].id
+        filters.offset += filters.limit
+    return notes[:EXPORT_MAX_NOTES]
+
+EXPORT_COLUMNS = ["id", "body", "category", "driver", "track", "series", "created_at", "tags"]
+
+def _export_rows(notes):
+    """Yield one CSV export row per note."""
+    for note in notes:
+        yield (
+            str(note.id),
+            note.body,
+            note.category.value,
+            note.driver_name,
+            note.track_name,
+            note.series_name,
+            note.created_at,
+            ", ".join(tag.label for tag in note.tags)
+        )
+
 def show_settings():
     """Display settings interface."""
     try:
         st.title("⚙️ Settings")
+        client = get_supabase_client()
         
         # Theme settings
         st.subheader("🎨 Theme")
@@ -678,30 +751,17 @@ def show_settings():
         with col1:
             if st.button("Export Notes as CSV"):
                 try:
-                    client = get_supabase_client()
-                    filters = SearchFilters(limit=1000)  # Get more data for export
-                    notes_response = asyncio.run(client.get_notes_feed(filters))
+                    notes = arun(_fetch_export_notes(client))
                     
                     # Convert to DataFrame
-                    data = []
-                    for note in notes_response.items:
-                        data.append({
-                            "id": str(note.id),
-                            "body": note.body,
-                            "category": note.category,
-                            "driver": note.driver_name,
-                            "track": note.track_name,
-                            "series": note.series_name,
-                            "created_at": note.created_at,
-                            "tags": ", ".join([tag.get("label", "") for tag in note.tags])
-                        })
-                    
-                    df = pd.DataFrame(data)
-                    csv = df.to_csv(index=False)
+                    import pandas as pd
+                    df = pd.DataFrame.from_records(_export_rows(notes), columns=EXPORT_COLUMNS)
+                    buf = io.BytesIO()
+                    df.to_csv(buf, index=False)
                     
                     st.download_button(
                         label="Download CSV",
-                        data=csv,
+                        data=buf.getvalue(),
                         file_name=f"racing_notes_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
                         mime="text/csv"
                     )
@@ -712,17 +772,15 @@ def show_settings():
         with col2:
             if st.button("Export Notes as JSON"):
                 try:
-                    client = get_supabase_client()
-                    filters = SearchFilters(limit=1000)
-                    notes_response = asyncio.run(client.get_notes_feed(filters))
+                    notes = arun(_fetch_export_notes(client))
                     
                     # Convert to JSON
-                    data = [note.dict() for note in notes_response.items]
-                    json_str = json.dumps(data, indent=2, default=str)
+                    data = [note.model_dump(mode="json") for note in notes]
+                    json_bytes = orjson.dumps(data, option=orjson.OPT_INDENT_2)
                     
                     st.download_button(
                         label="Download JSON",
-                        data=json_str,
+                        data=json_bytes,
                         file_name=f"racing_notes_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json",
                         mime="application/json"
                     )
@@ -738,6 +796,11 @@ def show_settings():
         with col1:
             if st.button("Clear Cache"):
                 CacheUtils.clear_cache()
+                _cached_reference_data.clear()
+                _reference_lookups.clear()
+                _cached_feed_page.clear()
+                _cached_stats.clear()
+                get_supabase_client().clear_reference_cache()
                 success_toast("Cache cleared successfully!")
         
         with col2:
@@ -745,46 +808,68 @@ def show_settings():
             cache_size = len(st.session_state.get("cache", {}))
             st.metric("Cached Items", cache_size)
         
+        # Debugging
+        st.subheader("🐞 Debugging")
+        st.session_state.debug = st.checkbox(
+            "Show error details",
+            value=st.session_state.get("debug", False)
+        )
+        
         # Statistics
         st.subheader("📊 Statistics")
+        _render_settings_stats()
+    
+    except Exception as e:
+        st.error(f"Error in settings: {e}")
+
+@st.fragment(run_every="30s")
+def _render_settings_stats():
+    """Render the statistics metrics; refreshes on its own timer."""
+    if st.button("Refresh Stats"):
+        _cached_stats.clear()
+    
+    try:
+        stats = _cached_stats()
         
-        try:
-            client = get_supabase_client()
-            stats = asyncio.run(client.get_stats())
-            
-            col1, col2, col3, col4 = st.columns(4)
-            
-            with col1:
-                st.metric("Total Notes", stats.get("notes_count", 0))
-            
-            with col2:
-                st.metric("Media Files", stats.get("media_count", 0))
-            
-            with col3:
-                st.metric("Tags", stats.get("tags_count", 0))
-            
-            with col4:
-                storage_mb = stats.get("storage_usage_mb", 0)
-                st.metric("Storage Used", f"{storage_mb:.1f} MB")
+        col1, col2, col3, col4 = st.columns(4)
         
-        except Exception as e:
-            st.error(f"Failed to load statistics: {e}")
+        with col1:
+            st.metric("Total Notes", stats.get("notes_count", 0))
+        
+        with col2:
+            st.metric("Media Files", stats.get("media_count", 0))
+        
+        with col3:
+            st.metric("Tags", stats.get("tags_count", 0))
+        
+        with col4:
+            storage_mb = stats.get("storage_usage_mb", 0)
+            st.metric("Storage Used", f"{storage_mb:.1f} MB")
     
     except Exception as e:
-        st.error(f"Error in settings: {e}")
+        st.error(f"Failed to load statistics: {e}")
+
+@st.fragment(run_every="30s")
+def _render_quick_stats():
+    """Render the sidebar quick stats; refreshes on its own timer."""
+    try:
+        stats = _cached_stats()
+        
+        st.metric("Notes", stats.get("notes_count", 0))
+        st.metric("Media", stats.get("media_count", 0))
+        st.metric("Storage", f"{stats.get('storage_usage_mb', 0):.1f} MB")
+    except Exception:
+        st.info("Stats unavailable")
 
 def main():
     """Main application entry point."""
     try:
         # Initialize
-        if not st.session_state.initialized:
-            with st.spinner("Initializing Racing Notes..."):
-                if init_clients():
-                    st.session_state.initialized = True
-                    success_toast("Racing Notes initialized successfully!")
-                else:
-                    st.error("Failed to initialize Racing Notes")
-                    st.stop()
+        try:
+            init_clients()
+        except Exception as e:
+            st.error(f"Failed to initialize Racing Notes: {e}")
+            st.stop()
         
         # Main navigation
         with st.sidebar:
@@ -793,34 +878,23 @@ def main():
             # Navigation menu
             selected = option_menu(
                 menu_title=None,
-                options=["Home Feed", "Create Note", "Media Search", "Settings"],
-                icons=["house", "plus-circle", "camera", "gear"],
+                options=_MENU_OPTIONS,
+                icons=_MENU_ICONS,
                 menu_icon="cast",
                 default_index=0,
                 orientation="vertical",
-                styles={
-                    "container": {"padding": "0!important", "background-color": "transparent"},
-                    "icon": {"color": "#1E3A8A", "font-size": "18px"},
-                    "nav-link": {"font-size": "16px", "text-align": "left", "margin": "0px"},
-                    "nav-link-selected": {"background-color": "#3B82F6", "color": "white"},
-                }
+                styles=_MENU_STYLES,
+                key="nav",
             )
             
             st.session_state.current_page = selected
+            if selected == "Home Feed":
+                _prefetch_feed()
             
             # Quick stats
             st.markdown("---")
             st.subheader("📊 Quick Stats")
-            
-            try:
-                client = get_supabase_client()
-                stats = asyncio.run(client.get_stats())
-                
-                st.metric("Notes", stats.get("notes_count", 0))
-                st.metric("Media", stats.get("media_count", 0))
-                st.metric("Storage", f"{stats.get('storage_usage_mb', 0):.1f} MB")
-            except Exception:
-                st.info("Stats unavailable")
+            _render_quick_stats()
         
         # Main content area
         if st.session_state.current_page == "Home Feed":
@@ -833,10 +907,11 @@ def main():
             show_settings()
     
     except Exception as e:
+        logger.exception("Application error")
         st.error(f"Application error: {e}")
-        import traceback
-        st.code(traceback.format_exc())
-        logger.error(f"Application error: {e}")
+        if st.session_state.get("debug"):
+            import traceback
+            st.code(traceback.format_exc())
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
@@ -0,0 +1,15 @@
+"""
+Shared pytest fixtures for the Racing Notes Desktop App V5 test suite.
+"""
+
+from unittest.mock import Mock, patch
+
+import pytest
+
+
+@pytest.fixture(scope="session", autouse=True)
+def patched_create_client():
+    """Patch supabase_client.create_client once for the whole run."""
+    with patch('supabase_client.create_client') as mock_create:
+        mock_create.return_value = Mock()
+        yield mock_create
@@ -3,12 +3,23 @@ Pydantic models for the Racing Notes Desktop App V5.
 Defines data structures with validation for all entities.
 """
 
-from datetime import datetime
+import os
+from datetime import datetime, timezone
 from enum import Enum
-from typing import Optional, List
+from types import MappingProxyType
+from typing import Annotated, Any, Dict, Generic, Mapping, Optional, List, TypeVar
 from uuid import UUID, uuid4
 
-from pydantic import BaseModel, Field, validator, ConfigDict
+from pydantic import BaseModel, Field, StringConstraints, TypeAdapter, computed_field, field_validator, ConfigDict
+
+# Upload limits checked by MediaUpload
+ALLOWED_UPLOAD_EXTENSIONS = frozenset({'.jpg', '.jpeg', '.png', '.gif', '.mp4', '.mov', '.avi'})
+MAX_UPLOAD_BYTES = 100 * 1024 * 1024  # 100MB
+
+
+def _utcnow() -> datetime:
+    """Timezone-aware UTC now, used only for rows built without server timestamps."""
+    return datetime.now(timezone.utc)
 
 
 class TrackTypeEnum(str, Enum):
@@ -40,92 +51,69 @@ class MediaTypeEnum(str, Enum):
     VIDEO = "video"
 
 
+# Frozen value -> member tables for values parsed by hand (form widgets, query params)
+SESSION_TYPE_BY_VALUE: Mapping[str, SessionTypeEnum] = MappingProxyType({m.value: m for m in SessionTypeEnum})
+CATEGORY_BY_VALUE: Mapping[str, CategoryEnum] = MappingProxyType({m.value: m for m in CategoryEnum})
+
+
 class Track(BaseModel):
     """Track model for racing venues."""
-    model_config = ConfigDict(from_attributes=True)
+    model_config = ConfigDict(from_attributes=True, str_strip_whitespace=True)
     
     id: UUID = Field(default_factory=uuid4)
     name: str = Field(..., min_length=1, max_length=255)
     type: TrackTypeEnum
-    created_at: datetime = Field(default_factory=datetime.utcnow)
-    updated_at: datetime = Field(default_factory=datetime.utcnow)
-
-    @validator('name')
-    def validate_name(cls, v):
-        """Validate track name."""
-        if not v.strip():
-            raise ValueError("Track name cannot be empty")
-        return v.strip()
+    created_at: datetime = Field(default_factory=_utcnow)
+    updated_at: datetime = Field(default_factory=_utcnow)
 
 
 class Series(BaseModel):
     """Series model for racing series."""
-    model_config = ConfigDict(from_attributes=True)
+    model_config = ConfigDict(from_attributes=True, str_strip_whitespace=True)
     
     id: UUID = Field(default_factory=uuid4)
     name: str = Field(..., min_length=1, max_length=255)
-    created_at: datetime = Field(default_factory=datetime.utcnow)
-    updated_at: datetime = Field(default_factory=datetime.utcnow)
-
-    @validator('name')
-    def validate_name(cls, v):
-        """Validate series name."""
-        if not v.strip():
-            raise ValueError("Series name cannot be empty")
-        return v.strip()
+    created_at: datetime = Field(default_factory=_utcnow)
+    updated_at: datetime = Field(default_factory=_utcnow)
 
 
 class Driver(BaseModel):
     """Driver model for racing drivers."""
-    model_config = ConfigDict(from_attributes=True)
+    model_config = ConfigDict(from_attributes=True, str_strip_whitespace=True)
     
     id: UUID = Field(default_factory=uuid4)
     name: str = Field(..., min_length=1, max_length=255)
     series_id: UUID
-    created_at: datetime = Field(default_factory=datetime.utcnow)
-    updated_at: datetime = Field(default_factory=datetime.utcnow)
-
-    @validator('name')
-    def validate_name(cls, v):
-        """Validate driver name."""
-        if not v.strip():
-            raise ValueError("Driver name cannot be empty")
-        return v.strip()
+    created_at: datetime = Field(default_factory=_utcnow)
+    updated_at: datetime = Field(default_factory=_utcnow)
 
 
 class Session(BaseModel):
     """Session model for racing sessions."""
-    model_config = ConfigDict(from_attributes=True)
+    model_config = ConfigDict(from_attributes=True, str_strip_whitespace=True)
     
     id: UUID = Field(default_factory=uuid4)
     date: datetime
     type: SessionTypeEnum
     track_id: UUID
     series_id: UUID
-    created_at: datetime = Field(default_factory=datetime.utcnow)
-    updated_at: datetime = Field(default_factory=datetime.utcnow)
+    created_at: datetime = Field(default_factory=_utcnow)
+    updated_at: datetime = Field(default_factory=_utcnow)
 
 
 class Tag(BaseModel):
     """Tag model for note categorization."""
-    model_config = ConfigDict(from_attributes=True)
+    model_config = ConfigDict(from_attributes=True, str_strip_whitespace=True)
     
     id: UUID = Field(default_factory=uuid4)
-    label: str = Field(..., min_length=1, max_length=50)
-    created_at: datetime = Field(default_factory=datetime.utcnow)
-    updated_at: datetime = Field(default_factory=datetime.utcnow)
-
-    @validator('label')
-    def validate_label(cls, v):
-        """Validate tag label."""
-        if not v.strip():
-            raise ValueError("Tag label cannot be empty")
-        return v.strip().lower()
+    label: Annotated[str, StringConstraints(strip_whitespace=True, to_lower=True, min_length=1, max_length=50)]
+    created_at: datetime = Field(default_factory=_utcnow)
+    updated_at: datetime = Field(default_factory=_utcnow)
 
 
 class Note(BaseModel):
     """Note model for racing notes."""
-    model_config = ConfigDict(from_attributes=True)
+    model_config = ConfigDict(from_attributes=True, str_strip_whitespace=True)
     
     id: UUID = Field(default_factory=uuid4)
     body: str = Field(..., min_length=1, max_length=5000)
@@ -133,20 +121,13 @@ class Note(BaseModel):
     driver_id: Optional[UUID] = None
     session_id: Optional[UUID] = None
     category: CategoryEnum = Field(default=CategoryEnum.GENERAL)
-    created_at: datetime = Field(default_factory=datetime.utcnow)
-    updated_at: datetime = Field(default_factory=datetime.utcnow)
-
-    @validator('body')
-    def validate_body(cls, v):
-        """Validate note body."""
-        if not v.strip():
-            raise ValueError("Note body cannot be empty")
-        return v.strip()
+    created_at: datetime = Field(default_factory=_utcnow)
+    updated_at: datetime = Field(default_factory=_utcnow)
 
 
 class Media(BaseModel):
     """Media model for note attachments."""
-    model_config = ConfigDict(from_attributes=True)
+    model_config = ConfigDict(from_attributes=True, str_strip_whitespace=True)
     
     id: UUID = Field(default_factory=uuid4)
     note_id: UUID
@@ -154,31 +135,17 @@ class Media(BaseModel):
     type: MediaTypeEnum
     size_mb: float = Field(..., ge=0)
     filename: str = Field(..., min_length=1, max_length=255)
-    created_at: datetime = Field(default_factory=datetime.utcnow)
-    updated_at: datetime = Field(default_factory=datetime.utcnow)
-
-    @validator('file_url')
-    def validate_file_url(cls, v):
-        """Validate file URL."""
-        if not v.strip():
-            raise ValueError("File URL cannot be empty")
-        return v.strip()
-
-    @validator('filename')
-    def validate_filename(cls, v):
-        """Validate filename."""
-        if not v.strip():
-            raise ValueError("Filename cannot be empty")
-        return v.strip()
+    created_at: datetime = Field(default_factory=_utcnow)
+    updated_at: datetime = Field(default_factory=_utcnow)
 
 
 class NoteTag(BaseModel):
     """Junction model for note-tag relationships."""
-    model_config = ConfigDict(from_attributes=True)
+    model_config = ConfigDict(from_attributes=True, str_strip_whitespace=True)
     
     note_id: UUID
     tag_id: UUID
-    created_at: datetime = Field(default_factory=datetime.utcnow)
+    created_at: datetime = Field(default_factory=_utcnow)
 
 
 # Enhanced models with relationships for UI display
@@ -195,34 +162,119 @@ class NoteWithDetails(Note):
     likes_count: int = Field(default=0)
     replies_count: int = Field(default=0)
 
-    @validator('tags', 'media', pre=True, always=True)
+    @field_validator('tags', 'media', mode='before')
+    @classmethod
     def default_empty_list(cls, v):
         return v or []
 
 
+# notes_with_details column -> FeedPage attribute
+_FEED_COLUMNS = {
+    "id": "ids",
+    "body": "bodies",
+    "shared": "shared",
+    "driver_id": "driver_ids",
+    "session_id": "session_ids",
+    "category": "categories",
+    "created_at": "created_at",
+    "updated_at": "updated_at",
+    "driver_name": "driver_names",
+    "session_type": "session_types",
+    "session_date": "session_dates",
+    "track_name": "track_names",
+    "track_type": "track_types",
+    "series_name": "series_names",
+    "tags": "tags",
+    "media": "media",
+    "likes_count": "likes_counts",
+    "replies_count": "replies_counts",
+}
+
+
+class FeedPage(BaseModel):
+    """Column-oriented page of the notes feed; rows are materialized on demand."""
+    ids: List[UUID] = Field(default_factory=list)
+    bodies: List[str] = Field(default_factory=list)
+    shared: List[Optional[bool]] = Field(default_factory=list)
+    driver_ids: List[Optional[UUID]] = Field(default_factory=list)
+    session_ids: List[Optional[UUID]] = Field(default_factory=list)
+    categories: List[Optional[CategoryEnum]] = Field(default_factory=list)
+    created_at: List[datetime] = Field(default_factory=list)
+    updated_at: List[datetime] = Field(default_factory=list)
+    driver_names: List[Optional[str]] = Field(default_factory=list)
+    session_types: List[Optional[SessionTypeEnum]] = Field(default_factory=list)
+    session_dates: List[Optional[datetime]] = Field(default_factory=list)
+    track_names: List[Optional[str]] = Field(default_factory=list)
+    track_types: List[Optional[TrackTypeEnum]] = Field(default_factory=list)
+    series_names: List[Optional[str]] = Field(default_factory=list)
+    tags: List[Optional[List[Dict[str, Any]]]] = Field(default_factory=list)
+    media: List[Optional[List[Dict[str, Any]]]] = Field(default_factory=list)
+    likes_counts: List[Optional[int]] = Field(default_factory=list)
+    replies_counts: List[Optional[int]] = Field(default_factory=list)
+    total: int = 0
+    limit: int = 20
+    offset: int = 0
+
+    @computed_field
+    @property
+    def has_next(self) -> bool:
+        return self.offset + self.limit < self.total
+
+    @computed_field
+    @property
+    def has_previous(self) -> bool:
+        return self.offset > 0
+
+    @classmethod
+    def from_rows(cls, rows: List[Dict[str, Any]], **page: Any) -> "FeedPage":
+        """Build the columns from notes_with_details rows in one validation pass."""
+        columns = {column: [row.get(key) for row in rows] for key, column in _FEED_COLUMNS.items()}
+        return cls(**columns, **page)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def tag_labels(self, i: int) -> List[str]:
+        """Tag labels of row i without building Tag models."""
+        return [tag["label"] for tag in self.tags[i] or []]
+
+    def row(self, i: int) -> NoteWithDetails:
+        """Materialize row i as a NoteWithDetails."""
+        values = {key: getattr(self, column)[i] for key, column in _FEED_COLUMNS.items()}
+        return NoteWithDetails(**{key: value for key, value in values.items() if value is not None})
+
+
 class MediaUpload(BaseModel):
     """Model for media upload requests."""
     filename: str = Field(..., min_length=1, max_length=255)
     content_type: str = Field(..., min_length=1)
     size_bytes: int = Field(..., ge=0)
-    data: bytes
+    # Raw bytes or a binary file object; file objects are read only when needed
+    data: Any = Field(..., exclude=True, repr=False)
 
-    @validator('filename')
+    @field_validator('filename')
+    @classmethod
     def validate_filename(cls, v):
         """Validate filename for upload."""
-        allowed_extensions = {'.jpg', '.jpeg', '.png', '.gif', '.mp4', '.mov', '.avi'}
-        if not any(v.lower().endswith(ext) for ext in allowed_extensions):
-            raise ValueError(f"File type not supported. Allowed: {', '.join(allowed_extensions)}")
+        if os.path.splitext(v.strip())[1].lower() not in ALLOWED_UPLOAD_EXTENSIONS:
+            raise ValueError(f"File type not supported. Allowed: {', '.join(sorted(ALLOWED_UPLOAD_EXTENSIONS))}")
         return v.strip()
 
-    @validator('size_bytes')
+    @field_validator('size_bytes')
+    @classmethod
     def validate_size(cls, v):
         """Validate file size (max 100MB)."""
-        max_size = 100 * 1024 * 1024  # 100MB in bytes
-        if v > max_size:
-            raise ValueError(f"File too large. Maximum size: {max_size / (1024*1024):.0f}MB")
+        if v > MAX_UPLOAD_BYTES:
+            raise ValueError(f"File too large. Maximum size: {MAX_UPLOAD_BYTES // (1024 * 1024)}MB")
         return v
 
+    def read(self) -> bytes:
+        """Return the file contents as bytes."""
+        if isinstance(self.data, bytes):
+            return self.data
+        self.data.seek(0)
+        return self.data.read()
+
 
 class UploadedMedia(BaseModel):
     """Model for uploaded media info."""
@@ -234,6 +286,8 @@ class UploadedMedia(BaseModel):
 
 class NoteCreate(BaseModel):
     """Model for creating new notes."""
+    model_config = ConfigDict(str_strip_whitespace=True)
+    
     body: str = Field(..., min_length=1, max_length=5000)
     shared: bool = Field(default=False)
     driver_id: Optional[UUID] = None
@@ -242,13 +296,6 @@ class NoteCreate(BaseModel):
     tag_ids: List[UUID] = Field(default_factory=list)
     media_files: List[UploadedMedia] = Field(default_factory=list)
 
-    @validator('body')
-    def validate_body(cls, v):
-        """Validate note body."""
-        if not v.strip():
-            raise ValueError("Note body cannot be empty")
-        return v.strip()
-
 
 class SearchFilters(BaseModel):
     """Model for search and filter parameters."""
@@ -265,13 +312,38 @@ class SearchFilters(BaseModel):
     has_media: Optional[bool] = None
     limit: int = Field(default=20, ge=1, le=100)
     offset: int = Field(default=0, ge=0)
+    # Keyset cursor: the last note of the previous page; takes precedence over offset
+    cursor_created_at: Optional[datetime] = None
+    cursor_id: Optional[UUID] = None
+
 
+T = TypeVar("T", bound=BaseModel)
 
-class PaginatedResponse(BaseModel):
+
+class PaginatedResponse(BaseModel, Generic[T]):
     """Generic paginated response model."""
-    items: List[BaseModel]
+    items: List[T]
     total: int
     limit: int
     offset: int
-    has_next: bool
-    has_previous: bool 
\ No newline at end of file
+
+    @computed_field
+    @property
+    def has_next(self) -> bool:
+        return self.offset + self.limit < self.total
+
+    @computed_field
+    @property
+    def has_previous(self) -> bool:
+        return self.offset > 0
+
+
+# Built once at import so list results are validated in a single pydantic-core call
+NoteWithDetailsListAdapter = TypeAdapter(List[NoteWithDetails])
+TrackListAdapter = TypeAdapter(List[Track])
+SeriesListAdapter = TypeAdapter(List[Series])
+DriverListAdapter = TypeAdapter(List[Driver])
+SessionListAdapter = TypeAdapter(List[Session])
+TagListAdapter = TypeAdapter(List[Tag])
+MediaListAdapter = TypeAdapter(List[Media])
+NoteTagListAdapter = TypeAdapter(List[NoteTag])
@@ -146,8 +146,11 @@ CREATE INDEX idx_notes_body_trgm ON notes USING gin(body gin_trgm_ops);
 
 -- Media indexes
 CREATE INDEX idx_media_note_id ON media(note_id);
+CREATE INDEX idx_media_file_url ON media(file_url);
 CREATE INDEX idx_media_type ON media(type);
 CREATE INDEX idx_media_created_at ON media(created_at DESC);
+-- ILIKE '%...%' search: tags.label is covered by idx_tags_label_trgm, notes.body by idx_notes_body_trgm
+CREATE INDEX idx_media_filename_trgm ON media USING gin(filename gin_trgm_ops);
 
 -- Note-Tags indexes
 CREATE INDEX idx_note_tags_note_id ON note_tags(note_id);
@@ -261,7 +264,9 @@ SELECT
     -- Aggregate counts
     COALESCE(likes_count.count, 0) as likes_count,
     COALESCE(replies_count.count, 0) as replies_count,
-    COALESCE(media_count.count, 0) as media_count,
+    
+    -- Media flag, read off the media array join rather than a separate count
+    (media_array.note_id IS NOT NULL) as has_media,
     
     -- Tags as array
     COALESCE(tags_array.tags, '{}') as tags,
@@ -284,11 +289,6 @@ LEFT JOIN (
     FROM replies
     GROUP BY note_id
 ) replies_count ON n.id = replies_count.note_id
-LEFT JOIN (
-    SELECT note_id, COUNT(*) as count
-    FROM media
-    GROUP BY note_id
-) media_count ON n.id = media_count.note_id
 LEFT JOIN (
     SELECT nt.note_id, array_agg(
         json_build_object(
@@ -319,7 +319,7 @@ LEFT JOIN (
 ) media_array ON n.id = media_array.note_id;
 
 -- Create indexes on materialized view
-CREATE INDEX idx_notes_with_details_created_at ON notes_with_details(created_at DESC);
+CREATE INDEX idx_notes_with_details_created_at ON notes_with_details(created_at DESC, id DESC);
 CREATE INDEX idx_notes_with_details_shared ON notes_with_details(shared);
 CREATE INDEX idx_notes_with_details_driver_id ON notes_with_details(driver_id);
 CREATE INDEX idx_notes_with_details_session_id ON notes_with_details(session_id);
@@ -334,6 +334,17 @@ BEGIN
 END;
 $$ LANGUAGE plpgsql;
 
+-- Function returning all reference tables in one round-trip
+CREATE OR REPLACE FUNCTION get_reference_data()
+RETURNS JSONB AS $$
+    SELECT jsonb_build_object(
+        'tracks', COALESCE((SELECT jsonb_agg(t ORDER BY t.name) FROM tracks t), '[]'::jsonb),
+        'series', COALESCE((SELECT jsonb_agg(ser ORDER BY ser.name) FROM series ser), '[]'::jsonb),
+        'drivers', COALESCE((SELECT jsonb_agg(d ORDER BY d.name) FROM drivers d), '[]'::jsonb),
+        'tags', COALESCE((SELECT jsonb_agg(tg ORDER BY tg.label) FROM tags tg), '[]'::jsonb)
+    );
+$$ LANGUAGE sql STABLE;
+
 -- Create RLS policies (for future multi-user support)
 ALTER TABLE tracks ENABLE ROW LEVEL SECURITY;
 ALTER TABLE series ENABLE ROW LEVEL SECURITY;
@@ -388,4 +399,14 @@ LEFT JOIN drivers d ON n.driver_id = d.id
 LEFT JOIN sessions s ON n.session_id = s.id
 LEFT JOIN tracks t ON s.track_id = t.id
 LEFT JOIN series ser ON (s.series_id = ser.id OR d.series_id = ser.id)
-ORDER BY m.created_at DESC; 
\ No newline at end of file
+ORDER BY m.created_at DESC;
+
+-- Create view for tag usage, aggregated in the database
+CREATE VIEW popular_tags AS
+SELECT 
+    tg.*,
+    COUNT(nt.note_id) as usage
+FROM tags tg
+LEFT JOIN note_tags nt ON nt.tag_id = tg.id
+GROUP BY tg.id
+ORDER BY usage DESC, tg.label;
@@ -4,15 +4,24 @@ Handles media compression, upload, and download with retry logic.
 """
 
 import asyncio
+import functools
+import hashlib
 import io
+import multiprocessing
 import os
+import shutil
+import subprocess
 import tempfile
+import time
 import uuid
-from typing import Optional, Tuple, List, Dict, Any, BinaryIO
+import weakref
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, Tuple, List, Dict, Any, BinaryIO, Union
 from datetime import datetime
 from pathlib import Path
 
-from PIL import Image, ImageOps, ExifTags
+from PIL import Image, ImageOps
 from loguru import logger
 
 # Optional imports
@@ -24,6 +33,7 @@ except ImportError:
 
 try:
     import pillow_heif
+    pillow_heif.register_heif_opener()  # at import so pool workers get it too
     PILLOW_HEIF_AVAILABLE = True
 except ImportError:
     PILLOW_HEIF_AVAILABLE = False
@@ -34,6 +44,23 @@ try:
 except ImportError:
     STRUCTLOG_AVAILABLE = False
 
+# Optional libjpeg-turbo bindings for faster JPEG encoding
+try:
+    import numpy as np
+    from turbojpeg import TurboJPEG, TJPF_RGB, TJSAMP_420, TJFLAG_PROGRESSIVE
+    _turbo_jpeg = TurboJPEG()
+    TURBOJPEG_AVAILABLE = True
+except (ImportError, OSError, RuntimeError):
+    _turbo_jpeg = None
+    TURBOJPEG_AVAILABLE = False
+
+# Optional PyAV import for reading video metadata without decoding
+try:
+    import av
+    AV_AVAILABLE = True
+except ImportError:
+    AV_AVAILABLE = False
+
 # Optional moviepy import for video processing
 try:
     from moviepy.editor import VideoFileClip
@@ -46,6 +73,191 @@ from supabase_client import get_supabase_client
 from models import MediaTypeEnum, MediaUpload
 
 
+@functools.lru_cache(maxsize=1)
+def _nvenc_available() -> bool:
+    """Probe once whether the ffmpeg on PATH can actually encode with h264_nvenc.
+
+    Builds that list the encoder still fail without a usable GPU or driver, so encode one test frame.
+    """
+    ffmpeg = shutil.which("ffmpeg")
+    if ffmpeg is None:
+        return False
+    try:
+        result = subprocess.run(
+            [ffmpeg, "-hide_banner", "-loglevel", "error", "-f", "lavfi", "-i", "nullsrc=s=256x256",
+             "-frames:v", "1", "-c:v", "h264_nvenc", "-f", "null", "-"],
+            capture_output=True, timeout=30
+        )
+    except (OSError, subprocess.SubprocessError):
+        return False
+    return result.returncode == 0
+
+
+_MB = 1 << 20
+
+MEDIA_BUCKET = "racing-notes-v5-media"
+
+# Upper bound on JPEG bits per pixel at quality 85 for noisy photographic content
+_JPEG_WORST_CASE_BPP = 4.0
+
+
+def _save_jpeg(image: Image.Image, output: BinaryIO, quality: int, progressive: bool = False) -> None:
+    """Encode an RGB image as 4:2:0 JPEG, through libjpeg-turbo directly when available."""
+    if TURBOJPEG_AVAILABLE:
+        output.write(_turbo_jpeg.encode(
+            np.asarray(image), quality=quality, pixel_format=TJPF_RGB, jpeg_subsample=TJSAMP_420,
+            flags=TJFLAG_PROGRESSIVE if progressive else 0
+        ))
+    else:
+        image.save(output, format='JPEG', quality=quality, optimize=True,
+                   progressive=progressive, subsampling='4:2:0')
+
+
+async def _write_file(path: str, data: bytes) -> None:
+    """Write bytes to disk without blocking the event loop."""
+    if AIOFILES_AVAILABLE:
+        async with aiofiles.open(path, 'wb') as f:
+            await f.write(data)
+    else:
+        await asyncio.to_thread(Path(path).write_bytes, data)
+
+
+async def _read_file(path: str) -> bytes:
+    """Read a file from disk without blocking the event loop."""
+    if AIOFILES_AVAILABLE:
+        async with aiofiles.open(path, 'rb') as f:
+            return await f.read()
+    return await asyncio.to_thread(Path(path).read_bytes)
+
+
+def _fit_within(size: Tuple[int, int], box: Tuple[int, int]) -> Tuple[int, int]:
+    """Size after scaling down (never up) to fit within box, keeping the aspect ratio."""
+    scale = min(1.0, box[0] / size[0], box[1] / size[1])
+    return max(1, int(size[0] * scale)), max(1, int(size[1] * scale))
+
+
+def _draft_jpeg(image: Image.Image, box: Tuple[int, int]) -> None:
+    """Have libjpeg decode at the smallest 1/2, 1/4 or 1/8 scale that still covers the final size."""
+    # Orientations 5-8 are rotated 90 degrees, so the stored image must fit the transposed box
+    if image.getexif().get(0x0112) in (5, 6, 7, 8):
+        box = (box[1], box[0])
+    image.draft('RGB', _fit_within(image.size, box))
+
+
+def _compress_image(image_data: bytes, filename: str, max_size: Tuple[int, int], quality: int,
+                    max_compressed_size: int) -> Tuple[bytes, str]:
+    """Decode, resize and re-encode an image; runs in a worker process."""
+    try:
+        # Open image, letting libjpeg downscale in the DCT domain while decoding
+        image = Image.open(io.BytesIO(image_data))
+        original_format = image.format
+        if original_format == 'JPEG':
+            _draft_jpeg(image, max_size)
+
+        # Auto-rotate based on EXIF data
+        try:
+            ImageOps.exif_transpose(image, in_place=True)
+        except Exception as e:
+            logger.warning(f"Failed to process EXIF data: {e}")
+
+        # Convert to RGB if necessary
+        if image.mode in ('RGBA', 'LA', 'P'):
+            # Create white background for transparent images
+            background = Image.new('RGB', image.size, (255, 255, 255))
+            if image.mode == 'P':
+                image = image.convert('RGBA')
+            # An RGBA image used as the mask supplies its alpha band without a split() copy
+            background.paste(image, mask=image if image.mode == 'RGBA' else None)
+            image = background
+        elif image.mode != 'RGB':
+            image = image.convert('RGB')
+
+        # Resize if needed
+        if image.width > max_size[0] or image.height > max_size[1]:
+            image.thumbnail(max_size, Image.Resampling.LANCZOS)
+
+        # Choose the encoding up front from worst-case output sizes, so the
+        # oversize re-encode below is a rare safety net rather than a second pass
+        pixels = image.width * image.height
+        if pixels * _JPEG_WORST_CASE_BPP / 8 > max_compressed_size:
+            quality = max(50, quality - 20)
+        lossless_may_overflow = pixels * 3 > max_compressed_size
+
+        # Compress and save
+        output = io.BytesIO()
+
+        # Determine format
+        if original_format in ('HEIC', 'HEIF') or filename.lower().endswith(('.heic', '.heif')):
+            # Convert HEIC/HEIF to JPEG
+            _save_jpeg(image, output, quality, progressive=True)
+            new_filename = Path(filename).with_suffix('.jpg').name
+        elif original_format == 'PNG' and (len(image_data) > 2 * _MB or lossless_may_overflow):  # Convert large PNGs to JPEG
+            _save_jpeg(image, output, quality, progressive=True)
+            new_filename = Path(filename).with_suffix('.jpg').name
+        else:
+            # Keep original format
+            format_name = 'JPEG' if original_format == 'JPEG' else original_format
+            if format_name == 'JPEG':
+                _save_jpeg(image, output, quality, progressive=True)
+            else:
+                image.save(output, format=format_name, optimize=True)
+            new_filename = filename
+
+        compressed_data = output.getvalue()
+
+        # Check if compression was effective
+        if len(compressed_data) > max_compressed_size:
+            # Try more aggressive compression
+            output = io.BytesIO()
+            _save_jpeg(image, output, max(50, quality - 20), progressive=True)
+            compressed_data = output.getvalue()
+            new_filename = Path(filename).with_suffix('.jpg').name
+
+        logger.info(f"Image compressed: {len(image_data)} -> {len(compressed_data)} bytes")
+        return compressed_data, new_filename
+
+    except Exception as e:
+        logger.error(f"Failed to compress image: {e}")
+        raise
+
+
+def _generate_thumbnail(image_data: bytes, size: Tuple[int, int]) -> bytes:
+    """Build a JPEG thumbnail; runs in a worker process."""
+    try:
+        image = Image.open(io.BytesIO(image_data))
+        if image.format == 'JPEG':
+            _draft_jpeg(image, size)
+
+        # Shrink before rotating or converting so those passes only touch
+        # thumbnail-sized pixels; rotated orientations need the transposed box
+        box = size
+        if image.getexif().get(0x0112) in (5, 6, 7, 8):
+            box = (size[1], size[0])
+        if image.mode not in ('RGB', 'RGBA', 'L'):
+            image = image.convert('RGB')  # palette images resample poorly
+        image.thumbnail(box, Image.Resampling.LANCZOS)
+
+        # Auto-rotate based on EXIF data
+        try:
+            ImageOps.exif_transpose(image, in_place=True)
+        except Exception:
+            pass
+
+        # Convert to RGB if necessary
+        if image.mode != 'RGB':
+            image = image.convert('RGB')
+
+        # Save as JPEG
+        output = io.BytesIO()
+        _save_jpeg(image, output, 80)
+
+        return output.getvalue()
+
+    except Exception as e:
+        logger.error(f"Failed to generate thumbnail: {e}")
+        raise
+
+
 class StorageService:
     """Media storage service with compression and retry logic."""
 
@@ -65,112 +277,96 @@ class StorageService:
         self.video_max_height = 720
         self.video_bitrate = "1M"
         self.video_formats = {'.mp4', '.mov', '.avi', '.m4v'}
+        self.supported_formats = frozenset(self.image_formats | self.video_formats)
         
         # File size limits
-        self.max_file_size = 100 * 1024 * 1024  # 100MB
-        self.max_compressed_image_size = 10 * 1024 * 1024  # 10MB
-        self.max_compressed_video_size = 50 * 1024 * 1024  # 50MB
+        self.max_file_size = 100 * _MB
+        self.max_compressed_image_size = 10 * _MB
+        self.max_compressed_video_size = 50 * _MB
         
         # Retry configuration
         self.retry_delays = [1, 2, 4, 8, 16]  # Exponential backoff
         
-        # Enable HEIF support
-        if PILLOW_HEIF_AVAILABLE:
-            pillow_heif.register_heif_opener()
+        # Files processed at once by batch_process_media
+        self.max_concurrent_batch = 8
+        
+        # Recent uploads by content hash, so re-attached files skip compression and upload;
+        # entries expire so objects removed outside this service are not reused for long
+        self.upload_cache_size = 256
+        self.upload_cache_ttl = 3600  # seconds
+        self._upload_cache: "OrderedDict[bytes, Tuple[str, float, str, float]]" = OrderedDict()
+        
+        # Storage bucket handle, built on first use
+        self._bucket = None
+        self._bucket_client = None
+        
+        # Image work is CPU bound, so it runs in worker processes rather than on the event loop;
+        # the pool is started by the first image job
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        """Worker pool for image jobs, created on first use and shut down with the service or at exit."""
+        if self._pool is None:
+            # forkserver because forking the threaded Streamlit process can deadlock the child;
+            # spawn where forkserver does not exist (Windows)
+            start_method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+            self._pool = ProcessPoolExecutor(
+                max_workers=os.cpu_count(), mp_context=multiprocessing.get_context(start_method)
+            )
+            weakref.finalize(self, self._pool.shutdown, wait=False, cancel_futures=True)
+        return self._pool
+
+    @property
+    def bucket(self):
+        """Media bucket handle, rebuilt only when the Supabase client is recreated."""
+        client = get_supabase_client().client
+        if self._bucket is None or self._bucket_client is not client:
+            self._bucket = client.storage.from_(MEDIA_BUCKET)
+            self._bucket_client = client
+        return self._bucket
 
     async def compress_image(self, image_data: bytes, filename: str) -> Tuple[bytes, str]:
         """Compress an image with optimization."""
-        try:
-            # Open image
-            image = Image.open(io.BytesIO(image_data))
-            
-            # Auto-rotate based on EXIF data
-            try:
-                for orientation in ExifTags.TAGS.keys():
-                    if ExifTags.TAGS[orientation] == 'Orientation':
-                        break
-                
-                if hasattr(image, '_getexif'):
-                    exif = image._getexif()
-                    if exif is not None:
-                        orientation_value = exif.get(orientation)
-                        if orientation_value:
-                            image = ImageOps.exif_transpose(image)
-            except Exception as e:
-                self.logger.warning(f"Failed to process EXIF data: {e}")
-            
-            # Convert to RGB if necessary
-            if image.mode in ('RGBA', 'LA', 'P'):
-                # Create white background for transparent images
-                background = Image.new('RGB', image.size, (255, 255, 255))
-                if image.mode == 'P':
-                    image = image.convert('RGBA')
-                background.paste(image, mask=image.split()[-1] if image.mode == 'RGBA' else None)
-                image = background
-            elif image.mode != 'RGB':
-                image = image.convert('RGB')
-            
-            # Resize if needed
-            if image.width > self.image_max_width or image.height > self.image_max_height:
-                image.thumbnail((self.image_max_width, self.image_max_height), Image.Resampling.LANCZOS)
-            
-            # Compress and save
-            output = io.BytesIO()
-            
-            # Determine format
-            original_format = image.format
-            if original_format in ('HEIC', 'HEIF') or filename.lower().endswith(('.heic', '.heif')):
-                # Convert HEIC/HEIF to JPEG
-                image.save(output, format='JPEG', quality=self.image_quality, optimize=True)
-                new_filename = Path(filename).with_suffix('.jpg').name
-            elif original_format == 'PNG' and len(image_data) > 2 * 1024 * 1024:  # Convert large PNGs to JPEG
-                image.save(output, format='JPEG', quality=self.image_quality, optimize=True)
-                new_filename = Path(filename).with_suffix('.jpg').name
-            else:
-                # Keep original format
-                format_name = 'JPEG' if original_format == 'JPEG' else original_format
-                if format_name == 'JPEG':
-                    image.save(output, format=format_name, quality=self.image_quality, optimize=True)
-                else:
-                    image.save(output, format=format_name, optimize=True)
-                new_filename = filename
-            
-            compressed_data = output.getvalue()
-            
-            # Check if compression was effective
-            if len(compressed_data) > self.max_compressed_image_size:
-                # Try more aggressive compression
-                output = io.BytesIO()
-                quality = max(50, self.image_quality - 20)
-                image.save(output, format='JPEG', quality=quality, optimize=True)
-                compressed_data = output.getvalue()
-                new_filename = Path(filename).with_suffix('.jpg').name
-            
-            self.logger.info(f"Image compressed: {len(image_data)} -> {len(compressed_data)} bytes")
-            return compressed_data, new_filename
-            
-        except Exception as e:
-            self.logger.error(f"Failed to compress image: {e}")
-            raise
+        return await asyncio.get_running_loop().run_in_executor(
+            self._get_pool(), _compress_image, image_data, filename,
+            (self.image_max_width, self.image_max_height), self.image_quality, self.max_compressed_image_size
+        )
 
     async def compress_video(self, video_data: bytes, filename: str) -> Tuple[bytes, str]:
         """Compress a video with optimization."""
-        if not MOVIEPY_AVAILABLE:
-            # If moviepy is not available, return the original video data
+        # The first probe runs a test encode; keep it off the shared event loop
+        nvenc = await asyncio.to_thread(_nvenc_available)
+        if not MOVIEPY_AVAILABLE and not nvenc:
+            # If neither moviepy nor a GPU encoder is available, return the original video data
             self.logger.warning("MoviePy not available, returning original video data")
             return video_data, filename
             
         try:
             # Create temporary files
-            with tempfile.NamedTemporaryFile(suffix=Path(filename).suffix, delete=False) as input_file:
-                input_file.write(video_data)
-                input_path = input_file.name
+            fd, input_path = tempfile.mkstemp(suffix=Path(filename).suffix)
+            os.close(fd)
+            await _write_file(input_path, video_data)
             
             output_path = tempfile.mktemp(suffix='.mp4')
+            source = None
             
             try:
-                # Load video
-                video = VideoFileClip(input_path)
+                # Prefer the GPU pipeline; fall back to MoviePy/libx264 if it fails or overshoots
+                if nvenc:
+                    try:
+                        compressed_data = await asyncio.to_thread(self._transcode_nvenc, input_path)
+                        if len(compressed_data) <= self.max_compressed_video_size or not MOVIEPY_AVAILABLE:
+                            self.logger.info(f"Video compressed with NVENC: {len(video_data)} -> {len(compressed_data)} bytes")
+                            return compressed_data, Path(filename).with_suffix('.mp4').name
+                    except (OSError, subprocess.SubprocessError) as e:
+                        if not MOVIEPY_AVAILABLE:
+                            self.logger.warning(f"NVENC transcode failed and MoviePy not available, returning original video data: {e}")
+                            return video_data, filename
+                        self.logger.warning(f"NVENC transcode failed, falling back to libx264: {e}")
+                
+                # Load video once; both encode passes read from this clip
+                source = VideoFileClip(input_path)
+                video = source
                 
                 # Get video info
                 duration = video.duration
@@ -212,19 +408,13 @@ class StorageService:
                     logger=None
                 )
                 
-                video.close()
-                
                 # Read compressed video
-                with open(output_path, 'rb') as f:
-                    compressed_data = f.read()
+                compressed_data = await _read_file(output_path)
                 
                 # Check if compression was effective
                 if len(compressed_data) > self.max_compressed_video_size:
-                    # Try more aggressive compression
-                    if not MOVIEPY_AVAILABLE:
-                        self.logger.warning("MoviePy not available, cannot perform aggressive compression")
-                        return compressed_data, Path(filename).with_suffix('.mp4').name
-                    video = VideoFileClip(input_path)
+                    # Try more aggressive compression, reusing the open source clip
+                    video = source.set_fps(30) if fps > 30 else source
                     
                     # Further reduce quality
                     if width > 854 or height > 480:  # Reduce to 480p
@@ -245,10 +435,7 @@ class StorageService:
                         logger=None
                     )
                     
-                    video.close()
-                    
-                    with open(output_path, 'rb') as f:
-                        compressed_data = f.read()
+                    compressed_data = await _read_file(output_path)
                 
                 new_filename = Path(filename).with_suffix('.mp4').name
                 
@@ -256,7 +443,9 @@ class StorageService:
                 return compressed_data, new_filename
                 
             finally:
-                # Clean up temporary files
+                # Clean up the clip and temporary files
+                if source is not None:
+                    source.close()
                 try:
                     os.unlink(input_path)
                     os.unlink(output_path)
@@ -267,7 +456,90 @@ class StorageService:
             self.logger.error(f"Failed to compress video: {e}")
             raise
 
-    async def upload_media_with_retry(self, file_data: bytes, filename: str, 
+    def _nvenc_encode_args(self) -> List[str]:
+        """ffmpeg output options for the GPU pipeline (scale_cuda + NVENC, AAC audio)."""
+        scale = (
+            f"scale_cuda=w='min(iw,{self.video_max_width})':h='min(ih,{self.video_max_height})'"
+            ":force_original_aspect_ratio=decrease:force_divisible_by=2"
+        )
+        return [
+            "-vf", scale,
+            "-c:v", "h264_nvenc", "-preset", "p4", "-rc", "vbr", "-cq", "23", "-b:v", self.video_bitrate,
+            "-fpsmax", "30",
+            "-c:a", "aac",
+        ]
+
+    def _transcode_nvenc(self, input_path: str) -> bytes:
+        """Decode, scale and encode entirely on the GPU (NVDEC, scale_cuda, NVENC).
+
+        The input stays a file because MP4/MOV demuxing needs to seek, but the
+        result is written as fragmented MP4 straight to stdout.
+        """
+        result = subprocess.run([
+            shutil.which("ffmpeg"), "-hide_banner", "-loglevel", "error",
+            "-hwaccel", "cuda", "-hwaccel_output_format", "cuda",
+            "-i", input_path,
+            *self._nvenc_encode_args(),
+            "-movflags", "frag_keyframe+empty_moov+default_base_moof",
+            "-f", "mp4", "pipe:1",
+        ], check=True, capture_output=True, timeout=600)
+        return result.stdout
+
+    def _transcode_nvenc_batch(self, media_uploads: List[MediaUpload]) -> List[bytes]:
+        """Transcode several videos in one ffmpeg process so they share a single CUDA/NVENC setup."""
+        input_paths, output_paths = [], []
+        try:
+            for media_upload in media_uploads:
+                with self._spool_to_disk(media_upload) as spool:
+                    input_paths.append(spool.name)
+                fd, output_path = tempfile.mkstemp(suffix='.mp4')
+                os.close(fd)
+                output_paths.append(output_path)
+            
+            args = [shutil.which("ffmpeg"), "-y", "-hide_banner", "-loglevel", "error"]
+            for input_path in input_paths:
+                args += ["-hwaccel", "cuda", "-hwaccel_output_format", "cuda", "-i", input_path]
+            for i, output_path in enumerate(output_paths):
+                args += ["-map", f"{i}:v:0", "-map", f"{i}:a:0?", *self._nvenc_encode_args(), output_path]
+            subprocess.run(args, check=True, capture_output=True, timeout=600 * len(media_uploads))
+            
+            outputs = []
+            for output_path in output_paths:
+                with open(output_path, 'rb') as f:
+                    outputs.append(f.read())
+            return outputs
+        finally:
+            for path in input_paths + output_paths:
+                try:
+                    os.unlink(path)
+                except OSError:
+                    pass
+
+    @staticmethod
+    def _content_key(media_upload: MediaUpload) -> bytes:
+        """Hash the upload's bytes, streaming file objects in chunks."""
+        digest = hashlib.blake2b(digest_size=16)
+        data = media_upload.data
+        if isinstance(data, (bytes, bytearray, memoryview)):
+            digest.update(data)
+        else:
+            data.seek(0)
+            for chunk in iter(lambda: data.read(_MB), b""):
+                digest.update(chunk)
+        return digest.digest()
+
+    @staticmethod
+    def _spool_to_disk(media_upload: MediaUpload) -> BinaryIO:
+        """Copy an upload to a temporary file in 1 MB chunks and open it for streaming."""
+        with tempfile.NamedTemporaryFile(suffix=Path(media_upload.filename).suffix, delete=False) as spool:
+            if isinstance(media_upload.data, bytes):
+                spool.write(media_upload.data)
+            else:
+                media_upload.data.seek(0)
+                shutil.copyfileobj(media_upload.data, spool, _MB)
+        return open(spool.name, "rb")
+
+    async def upload_media_with_retry(self, file_data: Union[bytes, BinaryIO], filename: str, 
                                     content_type: str) -> Tuple[str, float]:
         """Upload media to Supabase storage with retry logic."""
         for attempt in range(self.max_retries):
@@ -280,18 +552,21 @@ class StorageService:
                 else:
                     raise Exception(f"Failed to upload after {self.max_retries} attempts: {e}")
 
-    async def _upload_media(self, file_data: bytes, filename: str, 
+    async def _upload_media(self, file_data: Union[bytes, BinaryIO], filename: str, 
                           content_type: str) -> Tuple[str, float]:
         """Upload media to Supabase storage."""
         try:
-            client = get_supabase_client()
-            
             # Generate unique filename
             timestamp = datetime.now().strftime("%Y/%m")
             unique_filename = f"{timestamp}/{uuid.uuid4()}_{filename}"
             
+            # File objects are streamed from the start on every attempt
+            if not isinstance(file_data, bytes):
+                file_data.seek(0)
+            
             # Upload to Supabase storage
-            upload_response = client.client.storage.from_("racing-notes-v5-media").upload(
+            upload_response = await asyncio.to_thread(
+                self.bucket.upload,
                 unique_filename,
                 file_data,
                 file_options={"content-type": content_type},
@@ -308,7 +583,7 @@ class StorageService:
                 raise Exception(f"Storage upload failed: {error_msg}")
 
             # Get public URL (may return dict {data:{publicUrl:...}} or simple string)
-            url_response = client.client.storage.from_("racing-notes-v5-media").get_public_url(unique_filename)
+            url_response = self.bucket.get_public_url(unique_filename)
             if isinstance(url_response, dict):
                 public_url = (
                     url_response.get("data", {}).get("publicUrl")
@@ -319,7 +594,8 @@ class StorageService:
                 public_url = url_response
             
             # Calculate file size in MB
-            size_mb = len(file_data) / (1024 * 1024)
+            size_bytes = len(file_data) if isinstance(file_data, bytes) else os.fstat(file_data.fileno()).st_size
+            size_mb = size_bytes / _MB
             
             self.logger.info(f"Media uploaded successfully: {unique_filename}")
             return public_url, size_mb
@@ -335,31 +611,52 @@ class StorageService:
             if progress_callback:
                 progress_callback(0, "Starting compression...")
             
+            # Identical bytes were already compressed and uploaded; reuse that object
+            content_key = await asyncio.to_thread(self._content_key, media_upload)
+            cached = self._upload_cache.get(content_key)
+            if cached is not None and time.monotonic() - cached[3] > self.upload_cache_ttl:
+                del self._upload_cache[content_key]
+                cached = None
+            if cached is not None:
+                self._upload_cache.move_to_end(content_key)
+                self.logger.info(f"Reusing previous upload for {media_upload.filename}")
+                if progress_callback:
+                    progress_callback(100, "Upload complete!")
+                public_url, size_mb, stored_filename, _ = cached
+                # Keep this upload's name, with the extension compression gave the stored copy
+                return public_url, size_mb, Path(media_upload.filename).with_suffix(Path(stored_filename).suffix).name
+            
             # Determine media type
-            file_ext = Path(media_upload.filename).suffix.lower()
+            file_ext = os.path.splitext(media_upload.filename)[1].lower()
             
             if file_ext in self.image_formats:
                 media_type = MediaTypeEnum.IMAGE
                 if progress_callback:
                     progress_callback(25, "Compressing image...")
+                image_data = await asyncio.to_thread(media_upload.read)
                 try:
                     compressed_data, new_filename = await self.compress_image(
-                        media_upload.data, media_upload.filename
+                        image_data, media_upload.filename
                     )
                 except Exception as e:
                     # Fallback: upload original image if compression fails (e.g., unsupported format)
                     self.logger.warning(
                         f"Image compression failed for {media_upload.filename}: {e}. Uploading original file without compression."
                     )
-                    compressed_data = media_upload.data
+                    compressed_data = image_data
                     new_filename = media_upload.filename
             elif file_ext in self.video_formats:
                 media_type = MediaTypeEnum.VIDEO
                 if progress_callback:
                     progress_callback(25, "Compressing video...")
-                compressed_data, new_filename = await self.compress_video(
-                    media_upload.data, media_upload.filename
-                )
+                if MOVIEPY_AVAILABLE or await asyncio.to_thread(_nvenc_available):
+                    compressed_data, new_filename = await self.compress_video(
+                        await asyncio.to_thread(media_upload.read), media_upload.filename
+                    )
+                else:
+                    # Nothing to transcode: stream the original from disk instead of memory
+                    compressed_data = await asyncio.to_thread(self._spool_to_disk, media_upload)
+                    new_filename = media_upload.filename
             else:
                 raise ValueError(f"Unsupported file type: {file_ext}")
             
@@ -367,13 +664,22 @@ class StorageService:
                 progress_callback(75, "Uploading to storage...")
             
             # Upload compressed media
-            public_url, size_mb = await self.upload_media_with_retry(
-                compressed_data, new_filename, media_upload.content_type
-            )
+            try:
+                public_url, size_mb = await self.upload_media_with_retry(
+                    compressed_data, new_filename, media_upload.content_type
+                )
+            finally:
+                if not isinstance(compressed_data, bytes):
+                    compressed_data.close()
+                    os.unlink(compressed_data.name)
             
             if progress_callback:
                 progress_callback(100, "Upload complete!")
             
+            self._upload_cache[content_key] = (public_url, size_mb, new_filename, time.monotonic())
+            if len(self._upload_cache) > self.upload_cache_size:
+                self._upload_cache.popitem(last=False)
+            
             return public_url, size_mb, new_filename
             
         except Exception as e:
@@ -381,25 +687,39 @@ class StorageService:
             raise
 
     async def delete_media(self, file_url: str) -> bool:
-        """Delete media from storage."""
+        """Delete media from storage once no media record references it.
+        
+        Identical uploads share one stored object, so the object is kept (and False
+        returned) while another note's media still points at it.
+        """
         try:
-            client = get_supabase_client()
+            if await get_supabase_client().is_media_url_referenced(file_url):
+                self.logger.info(f"Keeping shared media still referenced by other notes: {file_url}")
+                return False
             
             # Extract filename from URL
             # Assuming URL format: .../storage/v1/object/public/racing-notes-v5-media/filename
             parts = file_url.split('/')
-            if 'racing-notes-v5-media' in parts:
-                filename_parts = parts[parts.index('racing-notes-v5-media') + 1:]
+            if MEDIA_BUCKET in parts:
+                filename_parts = parts[parts.index(MEDIA_BUCKET) + 1:]
                 filename = '/'.join(filename_parts)
             else:
                 raise ValueError("Invalid file URL format")
             
             # Delete from storage
-            result = client.client.storage.from_("racing-notes-v5-media").remove([filename])
+            result = await asyncio.to_thread(
+                self.bucket.remove, [filename]
+            )
             
-            if result.get("error"):
+            # storage3 returns the removed objects as a list; older clients return a dict
+            if isinstance(result, dict) and result.get("error"):
                 raise Exception(f"Storage delete failed: {result['error']}")
             
+            # Forget the deleted object so a re-attached copy is uploaded again
+            for content_key, (public_url, *_) in list(self._upload_cache.items()):
+                if public_url == file_url:
+                    del self._upload_cache[content_key]
+            
             self.logger.info(f"Media deleted successfully: {filename}")
             return True
             
@@ -409,40 +729,16 @@ class StorageService:
 
     async def generate_thumbnail(self, image_data: bytes, size: Tuple[int, int] = (200, 200)) -> bytes:
         """Generate a thumbnail from image data."""
-        try:
-            image = Image.open(io.BytesIO(image_data))
-            
-            # Auto-rotate based on EXIF data
-            try:
-                image = ImageOps.exif_transpose(image)
-            except Exception:
-                pass
-            
-            # Convert to RGB if necessary
-            if image.mode != 'RGB':
-                image = image.convert('RGB')
-            
-            # Create thumbnail
-            image.thumbnail(size, Image.Resampling.LANCZOS)
-            
-            # Save as JPEG
-            output = io.BytesIO()
-            image.save(output, format='JPEG', quality=80, optimize=True)
-            
-            return output.getvalue()
-            
-        except Exception as e:
-            self.logger.error(f"Failed to generate thumbnail: {e}")
-            raise
+        return await asyncio.get_running_loop().run_in_executor(self._get_pool(), _generate_thumbnail, image_data, size)
 
     async def get_media_info(self, file_data: bytes, filename: str) -> Dict[str, Any]:
         """Get information about media file."""
         try:
-            file_ext = Path(filename).suffix.lower()
+            file_ext = os.path.splitext(filename)[1].lower()
             info = {
                 "filename": filename,
                 "size_bytes": len(file_data),
-                "size_mb": len(file_data) / (1024 * 1024),
+                "size_mb": len(file_data) / _MB,
                 "extension": file_ext
             }
             
@@ -460,7 +756,21 @@ class StorageService:
                     info["type"] = "image"
                     
             elif file_ext in self.video_formats:
-                if not MOVIEPY_AVAILABLE:
+                if AV_AVAILABLE:
+                    # Container headers only: no temp file and no ffmpeg subprocess
+                    try:
+                        with av.open(io.BytesIO(file_data), metadata_errors='ignore') as container:
+                            stream = container.streams.video[0]
+                            info.update({
+                                "type": "video",
+                                "width": stream.width,
+                                "height": stream.height,
+                                "duration": container.duration / av.time_base if container.duration else None,
+                                "fps": float(stream.average_rate) if stream.average_rate else None
+                            })
+                    except Exception:
+                        info["type"] = "video"
+                elif not MOVIEPY_AVAILABLE:
                     info["type"] = "video"
                 else:
                     try:
@@ -495,16 +805,15 @@ class StorageService:
     def validate_media_file(self, filename: str, file_size: int) -> Tuple[bool, str]:
         """Validate media file before processing."""
         try:
-            file_ext = Path(filename).suffix.lower()
+            file_ext = os.path.splitext(filename)[1].lower()
             
             # Check file extension
-            if file_ext not in (self.image_formats | self.video_formats):
+            if file_ext not in self.supported_formats:
                 return False, f"Unsupported file type: {file_ext}"
             
             # Check file size
             if file_size > self.max_file_size:
-                max_size_mb = self.max_file_size / (1024 * 1024)
-                return False, f"File too large: {file_size / (1024 * 1024):.1f}MB > {max_size_mb:.0f}MB"
+                return False, f"File too large: {file_size / _MB:.1f}MB > {self.max_file_size // _MB}MB"
             
             return True, "Valid"
             
@@ -514,41 +823,70 @@ class StorageService:
     async def batch_process_media(self, media_uploads: List[MediaUpload], 
                                 progress_callback: Optional[callable] = None) -> List[Dict[str, Any]]:
         """Process multiple media files in batch."""
-        results = []
         total_files = len(media_uploads)
         
-        for i, media_upload in enumerate(media_uploads):
+        # Transcode all valid videos in one GPU ffmpeg session up front
+        transcoded = {}
+        videos = [
+            media_upload for media_upload in media_uploads
+            if os.path.splitext(media_upload.filename)[1].lower() in self.video_formats
+            and self.validate_media_file(media_upload.filename, media_upload.size_bytes)[0]
+        ]
+        if len(videos) > 1 and await asyncio.to_thread(_nvenc_available):
             try:
-                if progress_callback:
-                    progress_callback(i, total_files, f"Processing {media_upload.filename}...")
-                
-                # Validate file
-                is_valid, message = self.validate_media_file(media_upload.filename, len(media_upload.data))
-                if not is_valid:
-                    results.append({
+                outputs = await asyncio.to_thread(self._transcode_nvenc_batch, videos)
+                transcoded = {
+                    id(media_upload): data for media_upload, data in zip(videos, outputs)
+                    if len(data) <= self.max_compressed_video_size
+                }
+            except (OSError, subprocess.SubprocessError) as e:
+                self.logger.warning(f"Batch NVENC transcode failed, compressing videos one by one: {e}")
+        
+        semaphore = asyncio.Semaphore(self.max_concurrent_batch)
+        
+        async def process_one(i: int, media_upload: MediaUpload) -> Dict[str, Any]:
+            async with semaphore:
+                try:
+                    if progress_callback:
+                        progress_callback(i, total_files, f"Processing {media_upload.filename}...")
+                    
+                    # Validate file
+                    is_valid, message = self.validate_media_file(media_upload.filename, media_upload.size_bytes)
+                    if not is_valid:
+                        return {
+                            "filename": media_upload.filename,
+                            "success": False,
+                            "error": message
+                        }
+                    
+                    # Process and upload
+                    if id(media_upload) in transcoded:
+                        new_filename = Path(media_upload.filename).with_suffix('.mp4').name
+                        public_url, size_mb = await self.upload_media_with_retry(
+                            transcoded[id(media_upload)], new_filename, media_upload.content_type
+                        )
+                    else:
+                        public_url, size_mb, new_filename = await self.process_and_upload_media(media_upload)
+                    
+                    return {
+                        "filename": media_upload.filename,
+                        "new_filename": new_filename,
+                        "success": True,
+                        "public_url": public_url,
+                        "size_mb": size_mb
+                    }
+                    
+                except Exception as e:
+                    return {
                         "filename": media_upload.filename,
                         "success": False,
-                        "error": message
-                    })
-                    continue
-                
-                # Process and upload
-                public_url, size_mb, new_filename = await self.process_and_upload_media(media_upload)
-                
-                results.append({
-                    "filename": media_upload.filename,
-                    "new_filename": new_filename,
-                    "success": True,
-                    "public_url": public_url,
-                    "size_mb": size_mb
-                })
-                
-            except Exception as e:
-                results.append({
-                    "filename": media_upload.filename,
-                    "success": False,
-                    "error": str(e)
-                })
+                        "error": str(e)
+                    }
+        
+        # Compression and uploads overlap across files; results keep the input order
+        results = await asyncio.gather(*(
+            process_one(i, media_upload) for i, media_upload in enumerate(media_uploads)
+        ))
         
         if progress_callback:
             progress_callback(total_files, total_files, "Batch processing complete!")
@@ -4,13 +4,18 @@ Provides all database operations with error handling and retries.
 """
 
 import asyncio
+import inspect
 import logging
+import random
+import time
 from typing import List, Optional, Dict, Any, Tuple
 from uuid import UUID
 import os
 from datetime import datetime, timedelta
 
-from supabase import create_client, Client
+import httpx
+import streamlit as st
+from supabase import create_client, Client, ClientOptions
 from postgrest.exceptions import APIError
 from loguru import logger
 
@@ -23,10 +28,25 @@ except ImportError:
 
 from models import (
     Track, Series, Driver, Session, Note, Media, Tag, NoteTag,
-    NoteWithDetails, NoteCreate, SearchFilters, PaginatedResponse,
+    NoteWithDetails, NoteWithDetailsListAdapter, NoteCreate, UploadedMedia, SearchFilters, PaginatedResponse, FeedPage,
+    TrackListAdapter, SeriesListAdapter, DriverListAdapter, SessionListAdapter, TagListAdapter,
+    MediaListAdapter, NoteTagListAdapter,
     TrackTypeEnum, SessionTypeEnum, CategoryEnum, MediaTypeEnum
 )
 
+# PostgREST codes for connection and pool failures; the request never ran
+_TRANSIENT_PGRST_CODES = frozenset({"PGRST000", "PGRST001", "PGRST002", "PGRST003"})
+
+# SQLSTATE classes worth retrying: connection, transaction rollback, resources, operator intervention
+_TRANSIENT_SQLSTATE_CLASSES = ("08", "40", "53", "57", "58")
+
+# Setup logging once at import rather than per client instance
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+_logger = structlog.get_logger(__name__) if STRUCTLOG_AVAILABLE else logger
+
 
 class SupabaseClient:
     """Async Supabase client with comprehensive error handling and retries."""
@@ -37,33 +57,62 @@ class SupabaseClient:
         self.supabase_key = supabase_key
         self.max_retries = max_retries
         self.client: Optional[Client] = None
-        self.logger = structlog.get_logger(__name__) if STRUCTLOG_AVAILABLE else logger
-        
-        # Setup logging
-        logging.basicConfig(
-            level=logging.INFO,
-            format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
-        )
+        self.http_client: Optional[httpx.Client] = None
+        self.logger = _logger
         
         # Connection retry configuration
         self.retry_delays = [1, 2, 4, 8, 16]  # Exponential backoff
         
+        # Short-lived cache for reference rows (tracks, series, drivers, tags), cleared on create
+        self.ref_cache_ttl = 60
+        self._ref_cache: Dict[Tuple[Any, ...], Tuple[float, Any]] = {}
+        
+        # Materialized view refreshes requested within this window are coalesced into one
+        self.refresh_delay = 0.5
+        self._refresh_dirty = False
+        self._refresh_task: Optional[asyncio.Task] = None
+        
     async def initialize(self) -> None:
         """Initialize the Supabase client with retries."""
+        await asyncio.to_thread(self.connect)
+
+    def connect(self) -> None:
+        """Create the underlying client and test the connection, retrying on failure."""
         for attempt in range(self.max_retries):
             try:
-                self.client = create_client(self.supabase_url, self.supabase_key)
-                await self._test_connection()
+                if self.http_client is None:
+                    self.http_client = self._create_http_client()
+                self.client = create_client(
+                    self.supabase_url,
+                    self.supabase_key,
+                    options=ClientOptions(httpx_client=self.http_client),
+                )
+                self._test_connection()
                 self.logger.info("Supabase client initialized successfully")
                 return
             except Exception as e:
                 self.logger.error(f"Failed to initialize Supabase client (attempt {attempt + 1}): {e}")
                 if attempt < self.max_retries - 1:
-                    await asyncio.sleep(self.retry_delays[attempt])
+                    time.sleep(self._retry_delay(attempt))
                 else:
                     raise Exception(f"Failed to initialize Supabase client after {self.max_retries} attempts")
 
-    async def _test_connection(self) -> None:
+    def _create_http_client(self) -> httpx.Client:
+        """Create the pooled HTTP client shared by PostgREST and Storage."""
+        # Keep every pooled connection warm between bursts; HTTP/2 multiplexes requests over them
+        limits = httpx.Limits(max_connections=20, max_keepalive_connections=20, keepalive_expiry=60)
+        # Long read/write budget for media uploads, but fail fast on unreachable hosts
+        timeout = httpx.Timeout(60.0, connect=5.0)
+        self.logger.info(f"HTTP client: http2=True, {limits}, {timeout}")
+        return httpx.Client(
+            http2=True,
+            limits=limits,
+            timeout=timeout,
+            headers={"Accept-Encoding": "gzip"},
+            follow_redirects=True,
+        )
+
+    def _test_connection(self) -> None:
         """Test the database connection."""
         try:
             result = self.client.table("tracks").select("count").execute()
@@ -72,30 +121,87 @@ class SupabaseClient:
             self.logger.error(f"Database connection test failed: {e}")
             raise
 
-    async def _execute_with_retry(self, operation, *args, **kwargs) -> Any:
-        """Execute a database operation with retry logic."""
+    def _retry_delay(self, attempt: int) -> float:
+        """Exponential backoff with full jitter, so clients recovering from the same blip spread out."""
+        return random.uniform(0, self.retry_delays[min(attempt, len(self.retry_delays) - 1)])
+
+    @staticmethod
+    def _is_transient(error: Exception, idempotent: bool = True) -> bool:
+        """Whether an error may succeed on retry; client errors (bad input, constraints, auth) never do."""
+        if isinstance(error, APIError):
+            code = error.code
+            if isinstance(code, int):
+                # A non-JSON error page (e.g. a gateway 502/503/504): postgrest reports the HTTP status
+                return code == 429 or (code >= 500 and idempotent)
+            if not code:
+                # No code at all is also a non-PostgREST page; the write may already have committed
+                return idempotent
+            return code in _TRANSIENT_PGRST_CODES or code.startswith(_TRANSIENT_SQLSTATE_CLASSES)
+        if isinstance(error, (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)):
+            # Never reached the server
+            return True
+        if isinstance(error, httpx.HTTPStatusError):
+            status = error.response.status_code
+            if status == 429:
+                return True
+            return status >= 500 and idempotent
+        if isinstance(error, (httpx.TransportError, ConnectionResetError)):
+            # The request may have reached the server; only repeat it if that is harmless
+            return idempotent
+        # Anything else (validation, KeyError, TypeError, ...) fails the same way every time
+        return False
+
+    async def _execute_with_retry(self, operation, *args, idempotent: bool = True, **kwargs) -> Any:
+        """Execute a database operation with retry logic; blocking callables run in a worker thread."""
         for attempt in range(self.max_retries):
             try:
-                return await operation(*args, **kwargs)
-            except APIError as e:
-                self.logger.error(f"API error (attempt {attempt + 1}): {e}")
-                if attempt < self.max_retries - 1:
-                    await asyncio.sleep(self.retry_delays[attempt])
-                else:
-                    raise
+                if inspect.iscoroutinefunction(operation):
+                    return await operation(*args, **kwargs)
+                return await asyncio.to_thread(operation, *args, **kwargs)
             except Exception as e:
-                self.logger.error(f"Unexpected error (attempt {attempt + 1}): {e}")
-                if attempt < self.max_retries - 1:
-                    await asyncio.sleep(self.retry_delays[attempt])
+                self.logger.error(f"{type(e).__name__} (attempt {attempt + 1}): {e}")
+                if attempt < self.max_retries - 1 and self._is_transient(e, idempotent):
+                    await asyncio.sleep(self._retry_delay(attempt))
                 else:
                     raise
 
+    async def _execute(self, query) -> Any:
+        """Run a blocking PostgREST request in a worker thread, retrying transient failures.
+        
+        Newer postgrest clients also retry GETs on 503/520 inside ``execute()``, so those
+        attempts multiply with the retries here.
+        """
+        # Newer builders keep the method on .request, older ones on the builder; unknown means a write
+        request = getattr(query, "request", None)
+        http_method = getattr(request, "http_method", None) or getattr(query, "http_method", None)
+        idempotent = http_method in ("GET", "HEAD")
+        return await self._execute_with_retry(query.execute, idempotent=idempotent)
+
+    def clear_reference_cache(self) -> None:
+        """Drop all cached reference rows."""
+        self._ref_cache.clear()
+
+    def _ref_cache_get(self, key: Tuple[Any, ...]) -> Any:
+        """Return a cached reference value, or None if missing or expired."""
+        entry = self._ref_cache.get(key)
+        if entry is not None and entry[0] > time.monotonic():
+            return entry[1]
+        return None
+
+    def _ref_cache_put(self, key: Tuple[Any, ...], value: Any) -> Any:
+        """Cache a reference value for ref_cache_ttl seconds and return it."""
+        self._ref_cache[key] = (time.monotonic() + self.ref_cache_ttl, value)
+        return value
+
     # Track operations
     async def get_tracks(self) -> List[Track]:
         """Get all tracks."""
         try:
-            result = self.client.table("tracks").select("*").order("name").execute()
-            return [Track(**track) for track in result.data]
+            cached = self._ref_cache_get(("tracks",))
+            if cached is not None:
+                return cached
+            result = await self._execute(self.client.table("tracks").select("*").order("name"))
+            return self._ref_cache_put(("tracks",), TrackListAdapter.validate_python(result.data))
         except Exception as e:
             self.logger.error(f"Failed to get tracks: {e}")
             raise
@@ -103,9 +209,13 @@ class SupabaseClient:
     async def get_track_by_id(self, track_id: UUID) -> Optional[Track]:
         """Get a track by ID."""
         try:
-            result = self.client.table("tracks").select("*").eq("id", str(track_id)).execute()
-            if result.data:
-                return Track(**result.data[0])
+            cache_key = ("track", str(track_id))
+            cached = self._ref_cache_get(cache_key)
+            if cached is not None:
+                return cached
+            result = await self._execute(self.client.table("tracks").select("*").eq("id", str(track_id)).maybe_single())
+            if result is not None and result.data:
+                return self._ref_cache_put(cache_key, Track(**result.data))
             return None
         except Exception as e:
             self.logger.error(f"Failed to get track {track_id}: {e}")
@@ -114,10 +224,11 @@ class SupabaseClient:
     async def create_track(self, name: str, track_type: TrackTypeEnum) -> Track:
         """Create a new track."""
         try:
-            result = self.client.table("tracks").insert({
+            result = await self._execute(self.client.table("tracks").insert({
                 "name": name,
                 "type": track_type.value
-            }).execute()
+            }))
+            self.clear_reference_cache()
             return Track(**result.data[0])
         except Exception as e:
             self.logger.error(f"Failed to create track: {e}")
@@ -127,8 +238,11 @@ class SupabaseClient:
     async def get_series(self) -> List[Series]:
         """Get all series."""
         try:
-            result = self.client.table("series").select("*").order("name").execute()
-            return [Series(**series) for series in result.data]
+            cached = self._ref_cache_get(("series",))
+            if cached is not None:
+                return cached
+            result = await self._execute(self.client.table("series").select("*").order("name"))
+            return self._ref_cache_put(("series",), SeriesListAdapter.validate_python(result.data))
         except Exception as e:
             self.logger.error(f"Failed to get series: {e}")
             raise
@@ -136,9 +250,13 @@ class SupabaseClient:
     async def get_series_by_id(self, series_id: UUID) -> Optional[Series]:
         """Get a series by ID."""
         try:
-            result = self.client.table("series").select("*").eq("id", str(series_id)).execute()
-            if result.data:
-                return Series(**result.data[0])
+            cache_key = ("series", str(series_id))
+            cached = self._ref_cache_get(cache_key)
+            if cached is not None:
+                return cached
+            result = await self._execute(self.client.table("series").select("*").eq("id", str(series_id)).maybe_single())
+            if result is not None and result.data:
+                return self._ref_cache_put(cache_key, Series(**result.data))
             return None
         except Exception as e:
             self.logger.error(f"Failed to get series {series_id}: {e}")
@@ -147,9 +265,10 @@ class SupabaseClient:
     async def create_series(self, name: str) -> Series:
         """Create a new series."""
         try:
-            result = self.client.table("series").insert({
+            result = await self._execute(self.client.table("series").insert({
                 "name": name
-            }).execute()
+            }))
+            self.clear_reference_cache()
             return Series(**result.data[0])
         except Exception as e:
             self.logger.error(f"Failed to create series: {e}")
@@ -159,11 +278,15 @@ class SupabaseClient:
     async def get_drivers(self, series_id: Optional[UUID] = None) -> List[Driver]:
         """Get drivers, optionally filtered by series."""
         try:
+            cache_key = ("drivers", str(series_id) if series_id else None)
+            cached = self._ref_cache_get(cache_key)
+            if cached is not None:
+                return cached
             query = self.client.table("drivers").select("*")
             if series_id:
                 query = query.eq("series_id", str(series_id))
-            result = query.order("name").execute()
-            return [Driver(**driver) for driver in result.data]
+            result = await self._execute(query.order("name"))
+            return self._ref_cache_put(cache_key, DriverListAdapter.validate_python(result.data))
         except Exception as e:
             self.logger.error(f"Failed to get drivers: {e}")
             raise
@@ -171,9 +294,13 @@ class SupabaseClient:
     async def get_driver_by_id(self, driver_id: UUID) -> Optional[Driver]:
         """Get a driver by ID."""
         try:
-            result = self.client.table("drivers").select("*").eq("id", str(driver_id)).execute()
-            if result.data:
-                return Driver(**result.data[0])
+            cache_key = ("driver", str(driver_id))
+            cached = self._ref_cache_get(cache_key)
+            if cached is not None:
+                return cached
+            result = await self._execute(self.client.table("drivers").select("*").eq("id", str(driver_id)).maybe_single())
+            if result is not None and result.data:
+                return self._ref_cache_put(cache_key, Driver(**result.data))
             return None
         except Exception as e:
             self.logger.error(f"Failed to get driver {driver_id}: {e}")
@@ -182,10 +309,11 @@ class SupabaseClient:
     async def create_driver(self, name: str, series_id: UUID) -> Driver:
         """Create a new driver."""
         try:
-            result = self.client.table("drivers").insert({
+            result = await self._execute(self.client.table("drivers").insert({
                 "name": name,
                 "series_id": str(series_id)
-            }).execute()
+            }))
+            self.clear_reference_cache()
             return Driver(**result.data[0])
         except Exception as e:
             self.logger.error(f"Failed to create driver: {e}")
@@ -212,8 +340,8 @@ class SupabaseClient:
             if date_to:
                 query = query.lte("date", date_to.isoformat())
                 
-            result = query.order("date", desc=True).execute()
-            return [Session(**session) for session in result.data]
+            result = await self._execute(query.order("date", desc=True))
+            return SessionListAdapter.validate_python(result.data)
         except Exception as e:
             self.logger.error(f"Failed to get sessions: {e}")
             raise
@@ -221,9 +349,9 @@ class SupabaseClient:
     async def get_session_by_id(self, session_id: UUID) -> Optional[Session]:
         """Get a session by ID."""
         try:
-            result = self.client.table("sessions").select("*").eq("id", str(session_id)).execute()
-            if result.data:
-                return Session(**result.data[0])
+            result = await self._execute(self.client.table("sessions").select("*").eq("id", str(session_id)).maybe_single())
+            if result is not None and result.data:
+                return Session(**result.data)
             return None
         except Exception as e:
             self.logger.error(f"Failed to get session {session_id}: {e}")
@@ -233,12 +361,12 @@ class SupabaseClient:
                            track_id: UUID, series_id: UUID) -> Session:
         """Create a new session."""
         try:
-            result = self.client.table("sessions").insert({
+            result = await self._execute(self.client.table("sessions").insert({
                 "date": date.isoformat(),
                 "type": session_type.value,
                 "track_id": str(track_id),
                 "series_id": str(series_id)
-            }).execute()
+            }))
             return Session(**result.data[0])
         except Exception as e:
             self.logger.error(f"Failed to create session: {e}")
@@ -248,11 +376,15 @@ class SupabaseClient:
     async def get_tags(self, search_term: Optional[str] = None) -> List[Tag]:
         """Get tags with optional search."""
         try:
+            cache_key = ("tags", search_term)
+            cached = self._ref_cache_get(cache_key)
+            if cached is not None:
+                return cached
             query = self.client.table("tags").select("*")
             if search_term:
                 query = query.ilike("label", f"%{search_term}%")
-            result = query.order("label").execute()
-            return [Tag(**tag) for tag in result.data]
+            result = await self._execute(query.order("label"))
+            return self._ref_cache_put(cache_key, TagListAdapter.validate_python(result.data))
         except Exception as e:
             self.logger.error(f"Failed to get tags: {e}")
             raise
@@ -260,9 +392,13 @@ class SupabaseClient:
     async def get_tag_by_id(self, tag_id: UUID) -> Optional[Tag]:
         """Get a tag by ID."""
         try:
-            result = self.client.table("tags").select("*").eq("id", str(tag_id)).execute()
-            if result.data:
-                return Tag(**result.data[0])
+            cache_key = ("tag", str(tag_id))
+            cached = self._ref_cache_get(cache_key)
+            if cached is not None:
+                return cached
+            result = await self._execute(self.client.table("tags").select("*").eq("id", str(tag_id)).maybe_single())
+            if result is not None and result.data:
+                return self._ref_cache_put(cache_key, Tag(**result.data))
             return None
         except Exception as e:
             self.logger.error(f"Failed to get tag {tag_id}: {e}")
@@ -271,100 +407,130 @@ class SupabaseClient:
     async def create_tag(self, label: str) -> Tag:
         """Create a new tag."""
         try:
-            result = self.client.table("tags").insert({
+            result = await self._execute(self.client.table("tags").insert({
                 "label": label.lower().strip()
-            }).execute()
+            }))
+            self.clear_reference_cache()
             return Tag(**result.data[0])
         except Exception as e:
             self.logger.error(f"Failed to create tag: {e}")
             raise
 
     async def get_or_create_tag(self, label: str) -> Tag:
-        """Get existing tag or create new one."""
+        """Get existing tag or create new one, atomically in a single upsert."""
         try:
-            # Try to find existing tag
-            result = self.client.table("tags").select("*").eq("label", label.lower().strip()).execute()
-            if result.data:
-                return Tag(**result.data[0])
+            label = label.lower().strip()
+            cache_key = ("tag_label", label)
+            cached = self._ref_cache_get(cache_key)
+            if cached is not None:
+                return cached
             
-            # Create new tag if not found
-            return await self.create_tag(label)
+            # ON CONFLICT (label) DO UPDATE returns the existing row, so there is no
+            # select-then-insert race between concurrent submissions of the same tag
+            result = await self._execute(self.client.table("tags").upsert(
+                {"label": label}, on_conflict="label"
+            ))
+            
+            # The tag may be new, so cached tag lists are stale
+            for key in [key for key in self._ref_cache if key[0] == "tags"]:
+                self._ref_cache.pop(key, None)
+            return self._ref_cache_put(cache_key, Tag(**result.data[0]))
         except Exception as e:
             self.logger.error(f"Failed to get or create tag: {e}")
             raise
 
     # Note operations
-    async def get_notes_feed(self, filters: Optional[SearchFilters] = None) -> PaginatedResponse:
+    async def get_notes_feed(self, filters: Optional[SearchFilters] = None) -> PaginatedResponse[NoteWithDetails]:
         """Get notes feed with optional filters and pagination."""
         try:
-            if not filters:
-                filters = SearchFilters()
-
-            query = self.client.table("notes_with_details").select("*")
-
-            # Apply filters
-            if filters.text_query:
-                query = query.text_search("search_vector", filters.text_query)
-            
-            if filters.track_ids:
-                query = query.in_("track_id", [str(tid) for tid in filters.track_ids])
-            
-            if filters.series_ids:
-                query = query.in_("series_id", [str(sid) for sid in filters.series_ids])
-            
-            if filters.driver_ids:
-                query = query.in_("driver_id", [str(did) for did in filters.driver_ids])
-            
-            if filters.categories:
-                query = query.in_("category", [cat.value for cat in filters.categories])
-            
-            if filters.session_types:
-                query = query.in_("session_type", [st.value for st in filters.session_types])
-            
-            if filters.date_from:
-                query = query.gte("created_at", filters.date_from.isoformat())
+            filters = filters or SearchFilters()
+            rows, total = await self._execute_with_retry(self._query_notes_feed, filters)
+            notes = NoteWithDetailsListAdapter.validate_python(rows)
             
-            if filters.date_to:
-                query = query.lte("created_at", filters.date_to.isoformat())
-            
-            if filters.shared_only:
-                query = query.eq("shared", True)
-            
-            if filters.has_media is not None:
-                if filters.has_media:
-                    query = query.gt("media_count", 0)
-                else:
-                    query = query.eq("media_count", 0)
-
-            # Get total count
-            count_result = query.execute()
-            total = len(count_result.data)
-
-            # Apply pagination
-            result = query.order("created_at", desc=True).range(
-                filters.offset, filters.offset + filters.limit - 1
-            ).execute()
-
-            notes = [NoteWithDetails(**note) for note in result.data]
-            
-            return PaginatedResponse(
+            return PaginatedResponse[NoteWithDetails](
                 items=notes,
                 total=total,
                 limit=filters.limit,
-                offset=filters.offset,
-                has_next=filters.offset + filters.limit < total,
-                has_previous=filters.offset > 0
+                offset=filters.offset
             )
         except Exception as e:
             self.logger.error(f"Failed to get notes feed: {e}")
             raise
 
+    async def get_feed_page(self, filters: Optional[SearchFilters] = None) -> FeedPage:
+        """Get one page of the notes feed as columns for rendering."""
+        try:
+            filters = filters or SearchFilters()
+            rows, total = await self._execute_with_retry(self._query_notes_feed, filters)
+            
+            return FeedPage.from_rows(
+                rows,
+                total=total,
+                limit=filters.limit,
+                offset=filters.offset
+            )
+        except Exception as e:
+            self.logger.error(f"Failed to get feed page: {e}")
+            raise
+
+    def _query_notes_feed(self, filters: SearchFilters) -> Tuple[List[Dict[str, Any]], int]:
+        """Run the filtered feed query, returning the page rows and total count."""
+        # The exact count comes back in the Content-Range header of the page request itself
+        query = self.client.table("notes_with_details").select("*", count="exact")
+
+        # Apply filters
+        if filters.text_query:
+            query = query.text_search("search_vector", filters.text_query)
+        
+        if filters.track_ids:
+            query = query.in_("track_id", [str(tid) for tid in filters.track_ids])
+        
+        if filters.series_ids:
+            query = query.in_("series_id", [str(sid) for sid in filters.series_ids])
+        
+        if filters.driver_ids:
+            query = query.in_("driver_id", [str(did) for did in filters.driver_ids])
+        
+        if filters.categories:
+            query = query.in_("category", [cat.value for cat in filters.categories])
+        
+        if filters.session_types:
+            query = query.in_("session_type", [st.value for st in filters.session_types])
+        
+        if filters.date_from:
+            query = query.gte("created_at", filters.date_from.isoformat())
+        
+        if filters.date_to:
+            query = query.lte("created_at", filters.date_to.isoformat())
+        
+        if filters.shared_only:
+            query = query.eq("shared", True)
+        
+        if filters.has_media is not None:
+            query = query.eq("has_media", filters.has_media)
+
+        # Apply pagination
+        query = query.order("created_at", desc=True).order("id", desc=True)
+        if filters.cursor_created_at and filters.cursor_id:
+            cursor_ts = filters.cursor_created_at.isoformat()
+            result = query.or_(
+                f'created_at.lt."{cursor_ts}",'
+                f'and(created_at.eq."{cursor_ts}",id.lt.{filters.cursor_id})'
+            ).limit(filters.limit).execute()
+            # The count covers only rows past the cursor; offset tracks the rows before it
+            total = filters.offset + (result.count or 0)
+        else:
+            result = query.range(filters.offset, filters.offset + filters.limit - 1).execute()
+            total = result.count or 0
+
+        return result.data, total
+
     async def get_note_by_id(self, note_id: UUID) -> Optional[NoteWithDetails]:
         """Get a note by ID with all related data."""
         try:
-            result = self.client.table("notes_with_details").select("*").eq("id", str(note_id)).execute()
-            if result.data:
-                return NoteWithDetails(**result.data[0])
+            result = await self._execute(self.client.table("notes_with_details").select("*").eq("id", str(note_id)).maybe_single())
+            if result is not None and result.data:
+                return NoteWithDetails(**result.data)
             return None
         except Exception as e:
             self.logger.error(f"Failed to get note {note_id}: {e}")
@@ -374,23 +540,22 @@ class SupabaseClient:
         """Create a new note with tags and media."""
         try:
             # Start transaction by creating the note first
-            note_result = self.client.table("notes").insert({
+            note_result = await self._execute(self.client.table("notes").insert({
                 "body": note_data.body,
                 "shared": note_data.shared,
                 "driver_id": str(note_data.driver_id) if note_data.driver_id else None,
                 "session_id": str(note_data.session_id) if note_data.session_id else None,
                 "category": note_data.category.value
-            }).execute()
+            }))
 
             note = Note(**note_result.data[0])
 
             # Add tags if provided
             if note_data.tag_ids:
-                for tag_id in note_data.tag_ids:
-                    await self.create_note_tag(note.id, tag_id)
+                await self.create_note_tags(note.id, note_data.tag_ids)
 
             # Refresh materialized view
-            await self.refresh_materialized_view()
+            self.schedule_refresh()
 
             return note
         except Exception as e:
@@ -400,9 +565,9 @@ class SupabaseClient:
     async def update_note(self, note_id: UUID, updates: Dict[str, Any]) -> Note:
         """Update a note."""
         try:
-            result = self.client.table("notes").update(updates).eq("id", str(note_id)).execute()
+            result = await self._execute(self.client.table("notes").update(updates).eq("id", str(note_id)))
             if result.data:
-                await self.refresh_materialized_view()
+                self.schedule_refresh()
                 return Note(**result.data[0])
             raise Exception(f"Note {note_id} not found")
         except Exception as e:
@@ -412,8 +577,8 @@ class SupabaseClient:
     async def delete_note(self, note_id: UUID) -> bool:
         """Delete a note."""
         try:
-            result = self.client.table("notes").delete().eq("id", str(note_id)).execute()
-            await self.refresh_materialized_view()
+            result = await self._execute(self.client.table("notes").delete().eq("id", str(note_id)))
+            self.schedule_refresh()
             return bool(result.data)
         except Exception as e:
             self.logger.error(f"Failed to delete note {note_id}: {e}")
@@ -424,25 +589,45 @@ class SupabaseClient:
                           size_mb: float, filename: str) -> Media:
         """Create a new media record."""
         try:
-            result = self.client.table("media").insert({
+            result = await self._execute(self.client.table("media").insert({
                 "note_id": str(note_id),
                 "file_url": file_url,
                 "type": media_type.value,
                 "size_mb": size_mb,
                 "filename": filename
-            }).execute()
+            }))
             
-            await self.refresh_materialized_view()
+            self.schedule_refresh()
             return Media(**result.data[0])
         except Exception as e:
             self.logger.error(f"Failed to create media: {e}")
             raise
 
+    async def create_media_bulk(self, note_id: UUID, media_files: List[UploadedMedia]) -> List[Media]:
+        """Create all media records for a note in one bulk insert."""
+        try:
+            result = await self._execute(self.client.table("media").insert([
+                {
+                    "note_id": str(note_id),
+                    "file_url": media_info.file_url,
+                    "type": media_info.type.value,
+                    "size_mb": media_info.size_mb,
+                    "filename": media_info.filename
+                }
+                for media_info in media_files
+            ]))
+            
+            self.schedule_refresh()
+            return MediaListAdapter.validate_python(result.data)
+        except Exception as e:
+            self.logger.error(f"Failed to create media: {e}")
+            raise
+
     async def get_media_by_note_id(self, note_id: UUID) -> List[Media]:
         """Get all media for a note."""
         try:
-            result = self.client.table("media").select("*").eq("note_id", str(note_id)).execute()
-            return [Media(**media) for media in result.data]
+            result = await self._execute(self.client.table("media").select("*").eq("note_id", str(note_id)))
+            return MediaListAdapter.validate_python(result.data)
         except Exception as e:
             self.logger.error(f"Failed to get media for note {note_id}: {e}")
             raise
@@ -450,30 +635,53 @@ class SupabaseClient:
     async def delete_media(self, media_id: UUID) -> bool:
         """Delete a media record."""
         try:
-            result = self.client.table("media").delete().eq("id", str(media_id)).execute()
-            await self.refresh_materialized_view()
+            result = await self._execute(self.client.table("media").delete().eq("id", str(media_id)))
+            self.schedule_refresh()
             return bool(result.data)
         except Exception as e:
             self.logger.error(f"Failed to delete media {media_id}: {e}")
             raise
 
+    async def is_media_url_referenced(self, file_url: str) -> bool:
+        """Check whether any media record still points at a storage URL."""
+        try:
+            result = await self._execute(
+                self.client.table("media").select("id").eq("file_url", file_url).limit(1)
+            )
+            return bool(result.data)
+        except Exception as e:
+            self.logger.error(f"Failed to check media references for {file_url}: {e}")
+            raise
+
     # Note-Tag operations
     async def create_note_tag(self, note_id: UUID, tag_id: UUID) -> NoteTag:
         """Create a note-tag relationship."""
         try:
-            result = self.client.table("note_tags").insert({
+            result = await self._execute(self.client.table("note_tags").insert({
                 "note_id": str(note_id),
                 "tag_id": str(tag_id)
-            }).execute()
+            }))
             return NoteTag(**result.data[0])
         except Exception as e:
             self.logger.error(f"Failed to create note-tag relationship: {e}")
             raise
 
+    async def create_note_tags(self, note_id: UUID, tag_ids: List[UUID]) -> List[NoteTag]:
+        """Create several note-tag relationships in one bulk insert."""
+        try:
+            result = await self._execute(self.client.table("note_tags").insert([
+                {"note_id": str(note_id), "tag_id": str(tag_id)}
+                for tag_id in tag_ids
+            ]))
+            return NoteTagListAdapter.validate_python(result.data)
+        except Exception as e:
+            self.logger.error(f"Failed to create note-tag relationships: {e}")
+            raise
+
     async def delete_note_tag(self, note_id: UUID, tag_id: UUID) -> bool:
         """Delete a note-tag relationship."""
         try:
-            result = self.client.table("note_tags").delete().eq("note_id", str(note_id)).eq("tag_id", str(tag_id)).execute()
+            result = await self._execute(self.client.table("note_tags").delete().eq("note_id", str(note_id)).eq("tag_id", str(tag_id)))
             return bool(result.data)
         except Exception as e:
             self.logger.error(f"Failed to delete note-tag relationship: {e}")
@@ -483,17 +691,55 @@ class SupabaseClient:
     async def refresh_materialized_view(self) -> None:
         """Refresh the materialized view for notes with details."""
         try:
-            self.client.rpc("refresh_notes_with_details").execute()
+            await self._execute(self.client.rpc("refresh_notes_with_details"))
         except Exception as e:
             self.logger.error(f"Failed to refresh materialized view: {e}")
             # Don't raise here as it's not critical for basic functionality
 
+    def schedule_refresh(self) -> None:
+        """Mark the materialized view stale and refresh it in the background, coalescing bursts of writes."""
+        self._refresh_dirty = True
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.get_running_loop().create_task(self._refresh_when_dirty())
+
+    async def _refresh_when_dirty(self) -> None:
+        """Refresh until no write has marked the view stale since the last refresh began."""
+        while self._refresh_dirty:
+            await asyncio.sleep(self.refresh_delay)
+            self._refresh_dirty = False
+            await self.refresh_materialized_view()
+
+    async def wait_for_refresh(self) -> None:
+        """Wait for any pending materialized view refresh, so reads see earlier writes."""
+        if self._refresh_task is not None:
+            await asyncio.shield(self._refresh_task)
+
+    async def get_reference_data(self) -> Tuple[List[Track], List[Series], List[Driver], List[Tag]]:
+        """Get all tracks, series, drivers and tags in a single RPC."""
+        try:
+            result = await self._execute(self.client.rpc("get_reference_data"))
+            data = result.data or {}
+            tracks = TrackListAdapter.validate_python(data.get("tracks", []))
+            series = SeriesListAdapter.validate_python(data.get("series", []))
+            drivers = DriverListAdapter.validate_python(data.get("drivers", []))
+            tags = TagListAdapter.validate_python(data.get("tags", []))
+            
+            # Seed the per-table reference cache so the individual getters are hits too
+            self._ref_cache_put(("tracks",), tracks)
+            self._ref_cache_put(("series",), series)
+            self._ref_cache_put(("drivers", None), drivers)
+            self._ref_cache_put(("tags", None), tags)
+            return tracks, series, drivers, tags
+        except Exception as e:
+            self.logger.error(f"Failed to get reference data: {e}")
+            raise
+
     async def get_popular_tags(self, limit: int = 20) -> List[Dict[str, Any]]:
         """Get popular tags with usage count."""
         try:
-            result = self.client.table("tags").select(
-                "*, note_tags(count)"
-            ).order("note_tags.count", desc=True).limit(limit).execute()
+            result = await self._execute(
+                self.client.table("popular_tags").select("*").order("usage", desc=True).limit(limit)
+            )
             return result.data
         except Exception as e:
             self.logger.error(f"Failed to get popular tags: {e}")
@@ -513,7 +759,7 @@ class SupabaseClient:
                     f"note_body.ilike.%{filters.text_query}%"
                 )
 
-            result = query.order("created_at", desc=True).limit(filters.limit).execute()
+            result = await self._execute(query.order("created_at", desc=True).limit(filters.limit))
             return result.data
         except Exception as e:
             self.logger.error(f"Failed to search media: {e}")
@@ -524,17 +770,18 @@ class SupabaseClient:
         try:
             stats = {}
             
-            # Get counts
-            notes_count = self.client.table("notes").select("count").execute()
-            media_count = self.client.table("media").select("count").execute()
-            tags_count = self.client.table("tags").select("count").execute()
-            
-            stats["notes_count"] = len(notes_count.data)
-            stats["media_count"] = len(media_count.data)
-            stats["tags_count"] = len(tags_count.data)
+            # Get counts and storage usage concurrently rather than one after another
+            notes_count, media_count, tags_count, storage_result = await asyncio.gather(
+                self._execute(self.client.table("notes").select("id", count="exact", head=True)),
+                self._execute(self.client.table("media").select("id", count="exact", head=True)),
+                self._execute(self.client.table("tags").select("id", count="exact", head=True)),
+                self._execute(self.client.table("media").select("sum(size_mb)")),
+            )
             
-            # Get storage usage
-            storage_result = self.client.table("media").select("sum(size_mb)").execute()
+            # HEAD requests: the counts arrive in Content-Range, with no rows in the body
+            stats["notes_count"] = notes_count.count or 0
+            stats["media_count"] = media_count.count or 0
+            stats["tags_count"] = tags_count.count or 0
             stats["storage_usage_mb"] = storage_result.data[0].get("sum", 0) if storage_result.data else 0
             
             return stats
@@ -543,45 +790,27 @@ class SupabaseClient:
             raise
 
 
-# Global client instance
-supabase_client: Optional[SupabaseClient] = None
+@st.cache_resource(show_spinner=False)
+def _create_supabase_client() -> SupabaseClient:
+    """Create and connect the process-wide Supabase client once; a failed connect is retried on the next call."""
+    try:
+        # Try Streamlit secrets first
+        supabase_url = st.secrets["SUPABASE_URL"]
+        supabase_key = st.secrets["SUPABASE_ANON_KEY"]
+    except Exception:
+        # Fall back to environment variables for local development
+        supabase_url = os.getenv("SUPABASE_URL", "http://localhost:8000")
+        supabase_key = os.getenv("SUPABASE_ANON_KEY", "demo-key")
+    supabase_client = SupabaseClient(supabase_url, supabase_key)
+    supabase_client.connect()
+    return supabase_client
 
 
 def get_supabase_client() -> SupabaseClient:
-    """Get the global Supabase client instance and ensure it is initialized."""
-    global supabase_client
-    if supabase_client is None:
-        try:
-            # Try Streamlit secrets first
-            import streamlit as st
-            supabase_url = st.secrets["SUPABASE_URL"]
-            supabase_key = st.secrets["SUPABASE_ANON_KEY"]
-        except Exception:
-            # Fall back to environment variables for local development
-            supabase_url = os.getenv("SUPABASE_URL", "http://localhost:8000")
-            supabase_key = os.getenv("SUPABASE_ANON_KEY", "demo-key")
-        supabase_client = SupabaseClient(supabase_url, supabase_key)
-
-    # Lazily initialize the underlying PostgREST client if it hasn't been done yet
-    if supabase_client.client is None:
-        try:
-            import nest_asyncio, asyncio
-            nest_asyncio.apply()
-            asyncio.run(supabase_client.initialize())
-        except RuntimeError:
-            # Already inside an event loop (Streamlit runtime); use create_task workaround
-            import asyncio
-            loop = asyncio.get_event_loop()
-            if not loop.is_running():
-                loop.run_until_complete(supabase_client.initialize())
-            else:
-                # Schedule initialization and wait briefly
-                loop.create_task(supabase_client.initialize())
-
-    return supabase_client
+    """Get the shared, already connected Supabase client instance."""
+    return _create_supabase_client()
 
 
 async def initialize_client() -> None:
     """Initialize the global Supabase client."""
-    client = get_supabase_client()
-    await client.initialize() 
\ No newline at end of file
+    await asyncio.to_thread(_create_supabase_client)
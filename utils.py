@@ -5,19 +5,121 @@ Provides helper functions for timestamps, caching, validation, and more.
 
 import asyncio
 import hashlib
+import importlib.util
+import os
 import re
+import uuid
+import warnings
 from datetime import datetime, timedelta
-from typing import Any, Dict, List, Optional, Tuple, Union
-from uuid import UUID
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
 
 import humanize
-import pandas as pd
+import numpy as np
+import orjson
 import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
 from dateutil import parser as date_parser
 from loguru import logger
 
 import io
 
+# Optional Aho-Corasick automaton for multi-term matching
+try:
+    import ahocorasick
+    AHOCORASICK_AVAILABLE = True
+except ImportError:
+    AHOCORASICK_AVAILABLE = False
+
+# Optional xlsxwriter engine, faster and lighter than openpyxl for writing workbooks
+XLSXWRITER_AVAILABLE = importlib.util.find_spec("xlsxwriter") is not None
+
+# Common racing terms that should become tags
+_RACING_TERMS = frozenset({
+    'restart', 'aero', 'aerodynamics', 'pit', 'strategy', 'tire', 'tires',
+    'fuel', 'setup', 'handling', 'speed', 'qualifying', 'pole', 'caution',
+    'debris', 'crash', 'wreck', 'leader', 'lap', 'draft', 'drafting',
+    'overtake', 'pass', 'position', 'finish', 'winner', 'checkered',
+    'yellow', 'green', 'flag', 'race', 'practice', 'session'
+})
+
+# Compiled once at import so the text helpers skip the re module's pattern cache
+_UNSAFE_FILENAME_CHARS_RE = re.compile(r'[^\w\s.-]')
+_UUID_RE = re.compile(r'\A[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}\Z')
+_HASHTAG_RE = re.compile(r'#(\w+)')
+_MENTION_RE = re.compile(r'@(\w+)')
+
+# Path separators and reserved characters become underscores; anything else unsafe is dropped
+_INVALID_FILENAME_CHARS = frozenset('<>:"/\\|?*')
+
+
+def _replace_unsafe_filename_char(match: re.Match) -> str:
+    """Replacement for one unsafe filename character."""
+    return '_' if match.group() in _INVALID_FILENAME_CHARS else ''
+
+
+# One pass over the text finds every term: the lookahead matches at each
+# position (longest term first), and terms contained in a match are added back
+_RACING_TERMS_RE = re.compile(
+    '(?=(' + '|'.join(map(re.escape, sorted(_RACING_TERMS, key=len, reverse=True))) + '))'
+)
+_RACING_TERM_PARTS = {
+    term: tuple(sorted(
+        (other for other in _RACING_TERMS if other in term),
+        key=lambda other: (term.index(other) + len(other), -len(other))
+    ))
+    for term in _RACING_TERMS
+}
+
+# With pyahocorasick installed, one automaton traversal reports every term occurrence directly
+if AHOCORASICK_AVAILABLE:
+    _RACING_TERMS_AUTOMATON = ahocorasick.Automaton()
+    for _term in _RACING_TERMS:
+        _RACING_TERMS_AUTOMATON.add_word(_term, _term)
+    _RACING_TERMS_AUTOMATON.make_automaton()
+else:
+    _RACING_TERMS_AUTOMATON = None
+
+
+# Race weekend sessions relative to midnight on race day (Sunday):
+# Friday practice 1 & 2, Saturday practice 3 & qualifying, Sunday race
+_RACE_WEEKEND_OFFSETS = {
+    "practice_1": timedelta(days=-2, hours=10),
+    "practice_2": timedelta(days=-2, hours=14),
+    "practice_3": timedelta(days=-1, hours=10),
+    "qualifying": timedelta(days=-1, hours=14),
+    "race": timedelta(hours=14)
+}
+
+# File extensions accepted as media
+_MEDIA_EXTENSIONS = frozenset({'.jpg', '.jpeg', '.png', '.gif', '.heic', '.heif', '.mp4', '.mov', '.avi', '.m4v'})
+
+# Tag badge markup per palette color, with only the tag left to fill in
+_TAG_BADGE_COLORS = {
+    "blue": "#E3F2FD",
+    "green": "#E8F5E8",
+    "red": "#FFEBEE",
+    "orange": "#FFF3E0",
+    "purple": "#F3E5F5",
+    "gray": "#F5F5F5"
+}
+_TAG_BADGE_TEMPLATES = {
+    color: f"""
+            <span style="
+                background-color: {bg_color};
+                color: #333;
+                padding: 2px 8px;
+                border-radius: 12px;
+                font-size: 0.8em;
+                font-weight: 500;
+                margin: 2px;
+                display: inline-block;
+            ">
+                #%s
+            </span>
+            """
+    for color, bg_color in _TAG_BADGE_COLORS.items()
+}
+
 
 class TimeUtils:
     """Utility functions for time and date operations."""
@@ -33,10 +135,10 @@ class TimeUtils:
                 return dt.strftime("%b %d, %Y")
             elif diff.days > 0:
                 return f"{diff.days} day{'s' if diff.days > 1 else ''} ago"
-            elif diff.seconds > 3600:
+            elif diff.seconds >= 3600:
                 hours = diff.seconds // 3600
                 return f"{hours} hour{'s' if hours > 1 else ''} ago"
-            elif diff.seconds > 60:
+            elif diff.seconds >= 60:
                 minutes = diff.seconds // 60
                 return f"{minutes} minute{'s' if minutes > 1 else ''} ago"
             else:
@@ -45,9 +147,45 @@ class TimeUtils:
             logger.error(f"Error humanizing datetime: {e}")
             return dt.strftime("%b %d, %Y")
     
+    @staticmethod
+    def humanize_datetimes(dts: Sequence[datetime]) -> List[str]:
+        """Humanize many datetimes at once, against a single reading of the clock."""
+        try:
+            now = np.datetime64(datetime.utcnow(), 'us')
+            stamps = np.array([dt.replace(tzinfo=None) for dt in dts], dtype='datetime64[us]')
+            days, remainder = np.divmod((now - stamps).astype(np.int64), 86_400_000_000)
+            seconds = remainder // 1_000_000
+            hours = seconds // 3600
+            minutes = seconds // 60
+            
+            # Same ladder as humanize_datetime: date, days, hours, minutes, just now
+            buckets = np.select([days > 7, days > 0, seconds >= 3600, seconds >= 60], [0, 1, 2, 3], default=4)
+            
+            results = []
+            for dt, bucket, d, h, m in zip(dts, buckets.tolist(), days.tolist(), hours.tolist(), minutes.tolist()):
+                if bucket == 0:
+                    results.append(dt.strftime("%b %d, %Y"))
+                elif bucket == 1:
+                    results.append(f"{d} day{'s' if d > 1 else ''} ago")
+                elif bucket == 2:
+                    results.append(f"{h} hour{'s' if h > 1 else ''} ago")
+                elif bucket == 3:
+                    results.append(f"{m} minute{'s' if m > 1 else ''} ago")
+                else:
+                    results.append("Just now")
+            return results
+        except Exception as e:
+            logger.error(f"Error humanizing datetimes: {e}")
+            return [TimeUtils.humanize_datetime(dt) for dt in dts]
+    
     @staticmethod
     def parse_date_string(date_str: str) -> Optional[datetime]:
         """Parse a date string to datetime object."""
+        try:
+            # ISO 8601 covers everything the database returns; dateutil handles free-form input
+            return datetime.fromisoformat(date_str)
+        except (TypeError, ValueError):
+            pass
         try:
             return date_parser.parse(date_str)
         except Exception as e:
@@ -72,26 +210,26 @@ class TimeUtils:
             logger.error(f"Error formatting duration: {e}")
             return "Unknown"
     
+    @staticmethod
+    def format_durations(durations: Sequence[float]) -> List[str]:
+        """Format many durations in seconds at once, matching format_duration."""
+        try:
+            values = np.asarray(durations, dtype=float)
+            short = np.char.mod('%.1fs', values)
+            medium = np.char.add(np.char.mod('%dm ', values // 60), np.char.mod('%.0fs', values % 60))
+            long = np.char.add(np.char.mod('%dh ', values // 3600), np.char.mod('%dm', (values % 3600) // 60))
+            return np.where(values < 60, short, np.where(values < 3600, medium, long)).tolist()
+        except Exception as e:
+            logger.error(f"Error formatting durations: {e}")
+            return [TimeUtils.format_duration(seconds) for seconds in durations]
+    
     @staticmethod
     def get_race_weekend_dates(base_date: datetime) -> Dict[str, datetime]:
         """Get typical race weekend dates based on a base date."""
         try:
-            # Assume base_date is race day (Sunday)
-            # Friday: Practice 1 & 2
-            # Saturday: Practice 3 & Qualifying
-            # Sunday: Race
-            
-            friday = base_date - timedelta(days=2)
-            saturday = base_date - timedelta(days=1)
-            sunday = base_date
-            
-            return {
-                "practice_1": friday.replace(hour=10, minute=0, second=0, microsecond=0),
-                "practice_2": friday.replace(hour=14, minute=0, second=0, microsecond=0),
-                "practice_3": saturday.replace(hour=10, minute=0, second=0, microsecond=0),
-                "qualifying": saturday.replace(hour=14, minute=0, second=0, microsecond=0),
-                "race": sunday.replace(hour=14, minute=0, second=0, microsecond=0)
-            }
+            # Assume base_date is race day (Sunday); sessions are fixed offsets from its midnight
+            race_day = base_date.replace(hour=0, minute=0, second=0, microsecond=0)
+            return {session: race_day + offset for session, offset in _RACE_WEEKEND_OFFSETS.items()}
         except Exception as e:
             logger.error(f"Error getting race weekend dates: {e}")
             return {}
@@ -103,18 +241,14 @@ class CacheUtils:
     @staticmethod
     def get_cache_key(prefix: str, *args: Any) -> str:
         """Generate a cache key from prefix and arguments."""
-        try:
-            # Convert all arguments to strings and join
-            arg_str = "_".join(str(arg) for arg in args)
-            
-            # Create a hash for very long keys
-            if len(arg_str) > 100:
-                arg_str = hashlib.md5(arg_str.encode()).hexdigest()
-            
-            return f"{prefix}_{arg_str}"
-        except Exception as e:
-            logger.error(f"Error generating cache key: {e}")
-            return f"{prefix}_default"
+        # The tuple repr keeps argument boundaries and types apart, so ("a_b", "c") and ("a", "b_c") differ
+        arg_str = repr(args)
+        
+        # Create a hash for very long keys
+        if len(arg_str) > 100:
+            arg_str = hashlib.blake2b(arg_str.encode(), digest_size=16).hexdigest()
+        
+        return f"{prefix}_{arg_str}"
     
     @staticmethod
     def cache_data(key: str, data: Any, ttl: int = 3600) -> None:
@@ -177,9 +311,17 @@ class ValidationUtils:
     
     @staticmethod
     def validate_uuid(uuid_str: str) -> bool:
-        """Validate if a string is a valid UUID."""
+        """Validate if a string is a valid UUID.
+        
+        Canonical 8-4-4-4-12 hex (any case) is checked with a regex; braced, URN and
+        un-hyphenated forms fall back to uuid.UUID.
+        """
+        if not isinstance(uuid_str, str):
+            return False
+        if _UUID_RE.match(uuid_str) is not None:
+            return True
         try:
-            UUID(uuid_str)
+            uuid.UUID(uuid_str)
             return True
         except ValueError:
             return False
@@ -200,10 +342,9 @@ class ValidationUtils:
     def validate_media_type(filename: str) -> Tuple[bool, str]:
         """Validate media file type."""
         try:
-            allowed_extensions = {'.jpg', '.jpeg', '.png', '.gif', '.heic', '.heif', '.mp4', '.mov', '.avi', '.m4v'}
-            file_ext = filename.lower().split('.')[-1]
+            file_ext = os.path.splitext(filename)[1].lower()
             
-            if f'.{file_ext}' not in allowed_extensions:
+            if file_ext not in _MEDIA_EXTENSIONS:
                 return False, f"Unsupported file type: {file_ext}"
             
             return True, "Valid"
@@ -215,8 +356,7 @@ class ValidationUtils:
         """Sanitize filename for safe storage."""
         try:
             # Remove or replace invalid characters
-            filename = re.sub(r'[<>:"/\\|?*]', '_', filename)
-            filename = re.sub(r'[^\w\s.-]', '', filename)
+            filename = _UNSAFE_FILENAME_CHARS_RE.sub(_replace_unsafe_filename_char, filename)
             filename = filename.strip()
             
             # Limit length
@@ -238,8 +378,7 @@ class TextUtils:
     def extract_hashtags(text: str) -> List[str]:
         """Extract hashtags from text."""
         try:
-            hashtag_pattern = r'#(\w+)'
-            hashtags = re.findall(hashtag_pattern, text)
+            hashtags = _HASHTAG_RE.findall(text)
             return [tag.lower() for tag in hashtags]
         except Exception as e:
             logger.error(f"Error extracting hashtags: {e}")
@@ -249,8 +388,7 @@ class TextUtils:
     def extract_mentions(text: str) -> List[str]:
         """Extract @mentions from text."""
         try:
-            mention_pattern = r'@(\w+)'
-            mentions = re.findall(mention_pattern, text)
+            mentions = _MENTION_RE.findall(text)
             return mentions
         except Exception as e:
             logger.error(f"Error extracting mentions: {e}")
@@ -260,29 +398,19 @@ class TextUtils:
     def suggest_tags(text: str) -> List[str]:
         """Suggest tags based on text content."""
         try:
-            # Common racing terms that should become tags
-            racing_terms = {
-                'restart', 'aero', 'aerodynamics', 'pit', 'strategy', 'tire', 'tires',
-                'fuel', 'setup', 'handling', 'speed', 'qualifying', 'pole', 'caution',
-                'debris', 'crash', 'wreck', 'leader', 'lap', 'draft', 'drafting',
-                'overtake', 'pass', 'position', 'finish', 'winner', 'checkered',
-                'yellow', 'green', 'flag', 'race', 'practice', 'session'
-            }
-            
-            # Convert text to lowercase and find matches
+            # Convert text to lowercase and find matches, keeping the order they appear in
             text_lower = text.lower()
-            suggestions = []
-            
-            for term in racing_terms:
-                if term in text_lower:
-                    suggestions.append(term)
+            if _RACING_TERMS_AUTOMATON is not None:
+                suggestions = dict.fromkeys(term for _, term in _RACING_TERMS_AUTOMATON.iter(text_lower))
+            else:
+                suggestions = dict.fromkeys(
+                    part for term in _RACING_TERMS_RE.findall(text_lower) for part in _RACING_TERM_PARTS[term]
+                )
             
             # Add hashtags found in text
-            hashtags = TextUtils.extract_hashtags(text)
-            suggestions.extend(hashtags)
+            suggestions.update(dict.fromkeys(TextUtils.extract_hashtags(text)))
             
-            # Remove duplicates and return
-            return list(set(suggestions))
+            return list(suggestions)
         except Exception as e:
             logger.error(f"Error suggesting tags: {e}")
             return []
@@ -296,8 +424,9 @@ class TextUtils:
             
             truncated = text[:max_length - len(suffix)]
             # Try to break at word boundary
-            if ' ' in truncated:
-                truncated = truncated.rsplit(' ', 1)[0]
+            last_space = truncated.rfind(' ')
+            if last_space != -1:
+                truncated = truncated[:last_space]
             
             return truncated + suffix
         except Exception as e:
@@ -328,6 +457,22 @@ class FormatUtils:
             logger.error(f"Error formatting file size: {e}")
             return "Unknown"
     
+    @staticmethod
+    def format_file_sizes(sizes_bytes: Sequence[int]) -> List[str]:
+        """Format many file sizes at once, matching format_file_size."""
+        try:
+            values = np.asarray(sizes_bytes, dtype=float)
+            size_mb = values / (1024 * 1024)
+            kb = np.char.mod('%.1f KB', values / 1024)
+            mb = np.char.mod('%.1f MB', size_mb)
+            gb = np.char.mod('%.1f GB', size_mb / 1024)
+            return np.where(
+                values == 0, "0 B", np.where(size_mb < 1, kb, np.where(size_mb < 1024, mb, gb))
+            ).tolist()
+        except Exception as e:
+            logger.error(f"Error formatting file sizes: {e}")
+            return [FormatUtils.format_file_size(size_bytes) for size_bytes in sizes_bytes]
+    
     @staticmethod
     def format_number(number: Union[int, float]) -> str:
         """Format number with appropriate suffix (K, M, B)."""
@@ -361,6 +506,23 @@ class FormatUtils:
         except Exception as e:
             logger.error(f"Error formatting percentage: {e}")
             return "Unknown"
+    
+    @staticmethod
+    def format_percentages(values: Sequence[float], totals: Sequence[float]) -> List[str]:
+        """Format many percentages at once, matching format_percentage."""
+        try:
+            values = np.asarray(values, dtype=float)
+            totals = np.asarray(totals, dtype=float)
+            zero_total = totals == 0
+            percentages = np.divide(values, totals, out=np.zeros_like(values), where=~zero_total) * 100
+            labels = np.where(
+                percentages < 0.1, "<0.1%",
+                np.where(percentages > 99.9, ">99.9%", np.char.mod('%.1f%%', percentages))
+            )
+            return np.where(zero_total, "0%", labels).tolist()
+        except Exception as e:
+            logger.error(f"Error formatting percentages: {e}")
+            return [FormatUtils.format_percentage(value, total) for value, total in zip(values, totals)]
 
 
 class ExportUtils:
@@ -370,8 +532,11 @@ class ExportUtils:
     def export_to_csv(data: List[Dict[str, Any]], filename: str) -> bytes:
         """Export data to CSV format."""
         try:
+            import pandas as pd
             df = pd.DataFrame(data)
-            return df.to_csv(index=False).encode('utf-8')
+            output = io.BytesIO()
+            df.to_csv(output, index=False, encoding='utf-8')
+            return output.getvalue()
         except Exception as e:
             logger.error(f"Error exporting to CSV: {e}")
             raise
@@ -380,8 +545,7 @@ class ExportUtils:
     def export_to_json(data: List[Dict[str, Any]], filename: str) -> bytes:
         """Export data to JSON format."""
         try:
-            df = pd.DataFrame(data)
-            return df.to_json(orient='records', indent=2).encode('utf-8')
+            return orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY, default=str)
         except Exception as e:
             logger.error(f"Error exporting to JSON: {e}")
             raise
@@ -390,9 +554,17 @@ class ExportUtils:
     def export_to_excel(data: List[Dict[str, Any]], filename: str) -> bytes:
         """Export data to Excel format."""
         try:
+            import pandas as pd
             df = pd.DataFrame(data)
             output = io.BytesIO()
-            with pd.ExcelWriter(output, engine='openpyxl') as writer:
+            if XLSXWRITER_AVAILABLE:
+                # No constant_memory: to_excel writes column by column, and that mode drops out-of-order cells
+                writer = pd.ExcelWriter(
+                    output, engine='xlsxwriter', engine_kwargs={'options': {'strings_to_urls': False}}
+                )
+            else:
+                writer = pd.ExcelWriter(output, engine='openpyxl')
+            with writer:
                 df.to_excel(writer, sheet_name='Racing Notes', index=False)
             return output.getvalue()
         except Exception as e:
@@ -400,6 +572,13 @@ class ExportUtils:
             raise
 
 
+def _show_toast(message: str, icon: str) -> None:
+    """Show a toast, or do nothing when there is no script run to show it in (CLI, worker threads)."""
+    # The context is thread-local, so it is looked up per call rather than cached
+    if get_script_run_ctx(suppress_warning=True) is not None:
+        st.toast(message, icon=icon)
+
+
 class UIUtils:
     """Utility functions for UI components."""
     
@@ -407,7 +586,7 @@ class UIUtils:
     def show_success_toast(message: str) -> None:
         """Show success toast message."""
         try:
-            st.toast(message, icon="✅")
+            _show_toast(message, "✅")
         except Exception as e:
             logger.error(f"Error showing success toast: {e}")
     
@@ -415,7 +594,7 @@ class UIUtils:
     def show_error_toast(message: str) -> None:
         """Show error toast message."""
         try:
-            st.toast(message, icon="❌")
+            _show_toast(message, "❌")
         except Exception as e:
             logger.error(f"Error showing error toast: {e}")
     
@@ -423,7 +602,7 @@ class UIUtils:
     def show_info_toast(message: str) -> None:
         """Show info toast message."""
         try:
-            st.toast(message, icon="ℹ️")
+            _show_toast(message, "ℹ️")
         except Exception as e:
             logger.error(f"Error showing info toast: {e}")
     
@@ -431,42 +610,15 @@ class UIUtils:
     def show_warning_toast(message: str) -> None:
         """Show warning toast message."""
         try:
-            st.toast(message, icon="⚠️")
+            _show_toast(message, "⚠️")
         except Exception as e:
             logger.error(f"Error showing warning toast: {e}")
     
     @staticmethod
     def create_tag_badge(tag: str, color: str = "blue") -> str:
         """Create HTML for a tag badge."""
-        try:
-            colors = {
-                "blue": "#E3F2FD",
-                "green": "#E8F5E8",
-                "red": "#FFEBEE",
-                "orange": "#FFF3E0",
-                "purple": "#F3E5F5",
-                "gray": "#F5F5F5"
-            }
-            
-            bg_color = colors.get(color, colors["blue"])
-            
-            return f"""
-            <span style="
-                background-color: {bg_color};
-                color: #333;
-                padding: 2px 8px;
-                border-radius: 12px;
-                font-size: 0.8em;
-                font-weight: 500;
-                margin: 2px;
-                display: inline-block;
-            ">
-                #{tag}
-            </span>
-            """
-        except Exception as e:
-            logger.error(f"Error creating tag badge: {e}")
-            return f"#{tag}"
+        template = _TAG_BADGE_TEMPLATES.get(color, _TAG_BADGE_TEMPLATES["blue"])
+        return template % (tag,)
     
     @staticmethod
     def create_progress_bar(current: int, total: int, label: str = "") -> None:
@@ -496,19 +648,16 @@ class AsyncUtils:
     @staticmethod
     async def batch_process(items: List[Any], batch_size: int = 10, 
                           process_func: callable = None) -> List[Any]:
-        """Process items in batches to avoid overwhelming the system."""
+        """Process items with at most batch_size in flight, to avoid overwhelming the system."""
         try:
-            results = []
-            for i in range(0, len(items), batch_size):
-                batch = items[i:i + batch_size]
-                batch_results = await asyncio.gather(*[process_func(item) for item in batch])
-                results.extend(batch_results)
-                
-                # Small delay between batches to avoid rate limiting
-                if i + batch_size < len(items):
-                    await asyncio.sleep(0.1)
+            # A slot frees as soon as any item finishes, rather than waiting for a whole batch
+            semaphore = asyncio.Semaphore(batch_size)
             
-            return results
+            async def process_with_limit(item):
+                async with semaphore:
+                    return await process_func(item)
+            
+            return list(await asyncio.gather(*(process_with_limit(item) for item in items)))
         except Exception as e:
             logger.error(f"Error in batch processing: {e}")
             raise
@@ -520,20 +669,21 @@ def get_time_ago(dt: datetime) -> str:
     return TimeUtils.humanize_datetime(dt)
 
 
-def cache_result(key: str, ttl: int = 3600):
-    """Decorator for caching function results."""
+def cache_result(key: Optional[str] = None, ttl: int = 3600, max_entries: int = 128):
+    """Decorator for caching function results with st.cache_data.
+    
+    Results are shared across all sessions, not kept per session, and keyed by the
+    function and its arguments; ``key`` is deprecated and ignored. The decorated
+    function gains a ``clear()`` method for invalidation.
+    """
+    if key is not None:
+        warnings.warn(
+            "cache_result's key argument is ignored; entries are keyed by the function and its arguments",
+            DeprecationWarning, stacklevel=2
+        )
+    
     def decorator(func):
-        def wrapper(*args, **kwargs):
-            cache_key = CacheUtils.get_cache_key(key, *args, **kwargs)
-            cached_result = CacheUtils.get_cached_data(cache_key)
-            
-            if cached_result is not None:
-                return cached_result
-            
-            result = func(*args, **kwargs)
-            CacheUtils.cache_data(cache_key, result, ttl)
-            return result
-        return wrapper
+        return st.cache_data(ttl=ttl, max_entries=max_entries, show_spinner=False)(func)
     return decorator
 
 